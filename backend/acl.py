@@ -0,0 +1,84 @@
+"""Makale erişim listesinin (ACL) bellek içi, materialize edilmiş hali.
+
+Her kullanıcı için sahip olduğu ve işbirlikçi olduğu makale id kümeleri,
+ayrıca genel (public) makale id kümesi tutulur. Yetki kontrolü makale
+satırını ve işbirliği tablosunu okumadan O(1), "makalelerim" listesi
+kullanıcının makale sayısıyla orantılı (O(k)) maliyetle yapılır.
+
+Küme `create_article`, `add_collaborator` ve `update_article` (is_public
+değişimi) tarafından güncel tutulur.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+# access() dönüş değerleri
+OWNER = "owner"
+COLLABORATOR = "collaborator"
+PUBLIC = "public"
+NONE = "none"
+
+
+class ArticleACL:
+    def __init__(self):
+        self._authors: Dict[int, int] = {}
+        self._owned: Dict[int, Set[int]] = {}
+        self._collaborating: Dict[int, Set[int]] = {}
+        self._public: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, articles: Iterable[Dict], collaborations: Iterable[Dict]) -> "ArticleACL":
+        acl = cls()
+        for article in articles:
+            acl._add_article(article['id'], article['author_id'], article['is_public'])
+        for collaboration in collaborations:
+            acl._collaborating.setdefault(collaboration['user_id'], set()).add(collaboration['article_id'])
+        return acl
+
+    def _add_article(self, article_id: int, author_id: int, is_public: bool):
+        self._authors[article_id] = author_id
+        self._owned.setdefault(author_id, set()).add(article_id)
+        if is_public:
+            self._public.add(article_id)
+
+    def add_article(self, article_id: int, author_id: int, is_public: bool):
+        with self._lock:
+            self._add_article(article_id, author_id, is_public)
+
+    def set_public(self, article_id: int, is_public: bool):
+        with self._lock:
+            if is_public:
+                self._public.add(article_id)
+            else:
+                self._public.discard(article_id)
+
+    def add_collaborator(self, article_id: int, user_id: int):
+        with self._lock:
+            self._collaborating.setdefault(user_id, set()).add(article_id)
+
+    def is_collaborator(self, article_id: int, user_id: int) -> bool:
+        with self._lock:
+            return article_id in self._collaborating.get(user_id, ())
+
+    def access(self, article_id: int, user_id: int) -> Optional[str]:
+        """Kullanıcının makaleye erişim türü; makale yoksa None"""
+        with self._lock:
+            author_id = self._authors.get(article_id)
+            if author_id is None:
+                return None
+            if author_id == user_id:
+                return OWNER
+            if article_id in self._collaborating.get(user_id, ()):
+                return COLLABORATOR
+            return PUBLIC if article_id in self._public else NONE
+
+    def user_article_ids(self, user_id: int, include_collaborations: bool = True) -> Set[int]:
+        with self._lock:
+            article_ids = set(self._owned.get(user_id, ()))
+            if include_collaborations:
+                article_ids.update(self._collaborating.get(user_id, ()))
+            return article_ids
+
+    def public_article_ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._public)
@@ -0,0 +1,236 @@
+"""Route sınıfı bazında kabul kontrolü (admission control) ve yük atma.
+
+İstekler dört sınıfa ayrılır: `ai`, `login`, `write`, `read`. Her sınıfın
+kendi eşzamanlılık sınırı ve sınırlı bekleme kuyruğu vardır; böylece AI
+trafiğindeki bir artış thread havuzunu doldurup okuma endpoint'lerini
+yavaşlatamaz. Ayrıca her kullanıcı (veya kimliksiz isteklerde IP) için
+sınıf bazında token bucket hız sınırı uygulanır.
+
+Reddedilen istekler zaman aşımını beklemeden hızlıca döner:
+- hız sınırı aşıldıysa 429
+- kuyruk doluysa veya tahmini bekleme süresi kuyruk süresini aşıyorsa 503
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import metrics
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# (eşzamanlılık, kuyruk uzunluğu, kuyruk süresi sn, saniyedeki istek, burst)
+# Eşzamanlılık 0 ise sınıf için eşzamanlılık sınırı uygulanmaz,
+# saniyedeki istek 0 ise hız sınırı uygulanmaz.
+DEFAULT_LIMITS = {
+    'ai': (4, 8, 2.0, 0.2, 5),
+    'login': (8, 32, 1.0, 1.0, 10),
+    'write': (16, 64, 2.0, 5.0, 20),
+    'read': (0, 0, 0.0, 0.0, 0),
+}
+
+EXEMPT_PATHS = {'/metrics'}
+
+admission_in_flight = metrics.registry.gauge(
+    "admission_in_flight", "Route sınıfı bazında işlenen istek sayısı", ("route_class",))
+admission_queue_depth = metrics.registry.gauge(
+    "admission_queue_depth", "Route sınıfı bazında kuyrukta bekleyen istek sayısı", ("route_class",))
+admission_rejected_total = metrics.registry.counter(
+    "admission_rejected_total", "Reddedilen istek sayısı", ("route_class", "reason"))
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Sınırlı kuyruklu, süre farkında semafor"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # Ortalama servis süresi (EWMA), tahmini bekleme süresini hesaplamak için
+        self.avg_service_time = 0.0
+
+    def _publish(self):
+        admission_in_flight.set(self.name, value=self.active)
+        admission_queue_depth.set(self.name, value=len(self.waiters))
+
+    def _estimated_wait(self) -> float:
+        return (len(self.waiters) + 1) * self.avg_service_time / self.max_concurrency
+
+    async def acquire(self):
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            self._publish()
+            return
+
+        if len(self.waiters) >= self.max_queue:
+            admission_rejected_total.inc(self.name, "queue_full")
+            raise Rejected(503, "Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin", self.queue_timeout)
+
+        if self._estimated_wait() > self.queue_timeout:
+            # Süresi içinde sıra gelmeyecek isteği kuyruğa hiç alma
+            admission_rejected_total.inc(self.name, "deadline")
+            raise Rejected(503, "Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin", self._estimated_wait())
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self._publish()
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except BaseException:
+            # İstek beklerken iptal edildi; devredilmiş bir slot varsa geri ver
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+                try:
+                    self.waiters.remove(future)
+                except ValueError:
+                    pass
+                self._publish()
+
+        if future.cancelled():
+            admission_rejected_total.inc(self.name, "timeout")
+            raise Rejected(503, "Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin", self.queue_timeout)
+        # Slot release() tarafından doğrudan devredildi, active zaten sayılıyor
+
+    def release(self, service_time: float):
+        self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+        self._release_slot()
+
+    def _release_slot(self):
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._publish()
+                return
+        self.active -= 1
+        self._publish()
+
+
+class TokenBucketLimiter:
+    """Anahtar (kullanıcı/IP) bazında token bucket"""
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+
+    def _prune(self, now: float):
+        # Dolmuş (uzun süredir boşta) kovaları at, bellek sınırsız büyümesin
+        idle = self.burst / self.rate
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < idle}
+        self._last_prune = now
+
+    def consume(self, key: str):
+        now = time.monotonic()
+        if now - self._last_prune > 60:
+            self._prune(now)
+        tokens, last = self.buckets.get(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens < 1.0:
+            self.buckets[key] = (tokens, now)
+            admission_rejected_total.inc(self.name, "rate_limit")
+            raise Rejected(429, "Çok fazla istek, lütfen daha sonra tekrar deneyin", (1.0 - tokens) / self.rate)
+        self.buckets[key] = (tokens - 1.0, now)
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """İsteğin route sınıfını belirler; None ise kabul kontrolü uygulanmaz"""
+    if method == 'OPTIONS' or path in EXEMPT_PATHS:
+        return None
+    if path.startswith('/ai/'):
+        return 'ai'
+    if method == 'POST' and path in ('/login', '/register'):
+        return 'login'
+    if method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        return 'write'
+    return 'read'
+
+
+class AdmissionControlMiddleware:
+    """Her isteği sınıfına göre hız sınırı ve eşzamanlılık sınırından geçiren ASGI middleware.
+
+    `key_func` ASGI scope'undan hız sınırı anahtarını (kullanıcı id'si veya IP) üretir.
+    """
+
+    def __init__(self, app, key_func: Callable[[dict], str]):
+        self.app = app
+        self.key_func = key_func
+        self.concurrency: Dict[str, ConcurrencyLimiter] = {}
+        self.rate_limits: Dict[str, TokenBucketLimiter] = {}
+        for name, defaults in DEFAULT_LIMITS.items():
+            prefix = f"ADMISSION_{name.upper()}_"
+            concurrency = int(_env_float(prefix + "CONCURRENCY", defaults[0]))
+            queue = int(_env_float(prefix + "QUEUE", defaults[1]))
+            queue_timeout = _env_float(prefix + "QUEUE_TIMEOUT", defaults[2])
+            rate = _env_float(prefix + "RATE", defaults[3])
+            burst = int(_env_float(prefix + "BURST", defaults[4]))
+            if concurrency > 0:
+                self.concurrency[name] = ConcurrencyLimiter(name, concurrency, queue, queue_timeout)
+            if rate > 0:
+                self.rate_limits[name] = TokenBucketLimiter(name, rate, max(burst, 1))
+
+    async def _reject(self, send, rejection: Rejected):
+        body = json.dumps({"detail": rejection.detail}, ensure_ascii=False).encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(rejection.retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope.get("method", ""), scope.get("path", ""))
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.concurrency.get(route_class)
+        try:
+            bucket = self.rate_limits.get(route_class)
+            if bucket is not None:
+                bucket.consume(self.key_func(scope))
+            if limiter is not None:
+                await limiter.acquire()
+        except Rejected as rejection:
+            await self._reject(send, rejection)
+            return
+
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
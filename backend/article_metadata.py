@@ -0,0 +1,47 @@
+"""Makale içeriğinden türetilen metadata (kelime sayısı, özet, okuma süresi).
+
+Metadata `create_article` / `update_article` sırasında bir kez hesaplanır ve
+makale satırında saklanır; listeleme endpoint'leri içeriği hiç yüklemeden bu
+alanları kullanır.
+"""
+import html
+import math
+import re
+from typing import Dict
+
+EXCERPT_LENGTH = 150
+WORDS_PER_MINUTE = 200
+
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# Listeleme projeksiyonunda taşınan alanlar (content hariç her şey)
+SUMMARY_FIELDS = (
+    'id', 'title', 'author_id', 'is_public', 'created_at', 'updated_at', 'current_version',
+    'word_count', 'excerpt', 'reading_time_minutes', 'contributors', 'last_editor_id',
+)
+
+
+def plain_text(content: str) -> str:
+    return html.unescape(_TAG_RE.sub('', content))
+
+
+def compute_metadata(content: str) -> Dict:
+    text = plain_text(content)
+    word_count = len(text.split())
+    return {
+        'word_count': word_count,
+        # Dashboard kartlarındaki önizlemeyle aynı: etiketsiz ilk 150 karakter
+        'excerpt': text[:EXCERPT_LENGTH],
+        'reading_time_minutes': max(1, math.ceil(word_count / WORDS_PER_MINUTE)) if word_count else 0,
+    }
+
+
+def summarize(article: Dict) -> Dict:
+    """Makale satırının içeriksiz listeleme projeksiyonu"""
+    summary = {field: article[field] for field in SUMMARY_FIELDS if field in article}
+    if 'word_count' not in summary:
+        # Metadata'sı henüz hesaplanmamış eski satırlar
+        summary.update(compute_metadata(article.get('content', '')))
+        summary.setdefault('contributors', [article['author_id']])
+        summary.setdefault('last_editor_id', article['author_id'])
+    return summary
@@ -0,0 +1,87 @@
+"""Satır bazında "kim, hangi versiyonda yazdı" (blame) hesaplaması.
+
+Versiyon N'in blame'i, versiyon N-1'in blame'i ve iki versiyon arasındaki tek
+bir diff'ten türetilir: değişmeyen satırlar önceki atamasını korur, eklenen
+veya değiştirilen satırlar N'e atanır. Hesaplanan her versiyon önbelleğe
+alınır; yeni bir versiyonun maliyeti geçmişin uzunluğuna değil, düzenlemenin
+boyutuna bağlıdır.
+
+Saklama politikasıyla silinen versiyonlar zincirden atlanır; bir sonraki
+mevcut versiyon doğrudan öncekiyle karşılaştırılır.
+"""
+import os
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Tuple
+
+BLAME_CACHE_SIZE = int(os.getenv("BLAME_CACHE_SIZE", "512"))
+
+# (satır, satırı getiren versiyon numarası, kullanıcı id)
+BlameLine = Tuple[str, int, int]
+
+
+def derive_blame(previous: List[BlameLine], new_lines: List[str], version_number: int, user_id: int) -> List[BlameLine]:
+    """Önceki blame'den ve tek bir diff'ten yeni versiyonun blame'ini üretir"""
+    previous_lines = [line for line, _, _ in previous]
+    matcher = SequenceMatcher(None, previous_lines, new_lines, autojunk=False)
+    result: List[BlameLine] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            result.extend(previous[i1:i2])
+        elif tag in ('replace', 'insert'):
+            result.extend((line, version_number, user_id) for line in new_lines[j1:j2])
+    return result
+
+
+class BlameCache:
+    """(article_id, version_number) -> blame, en son kullanılanlar tutulur"""
+
+    def __init__(self, max_entries: int = BLAME_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], List[BlameLine]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int]) -> Optional[List[BlameLine]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[int, int], blame: List[BlameLine]):
+        with self._lock:
+            self._entries[key] = blame
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _nearest(self, article_id: int, version_number: int) -> Tuple[int, List[BlameLine]]:
+        """Önbellekteki en yakın önceki (veya aynı) versiyon; yoksa (0, [])"""
+        with self._lock:
+            best = 0
+            for cached_article, cached_version in self._entries:
+                if cached_article == article_id and best < cached_version <= version_number:
+                    best = cached_version
+            if not best:
+                return 0, []
+            self._entries.move_to_end((article_id, best))
+            return best, self._entries[(article_id, best)]
+
+    def blame(self, article_id: int, version_number: int,
+              load_versions: Callable[[int, int], List[Dict]]) -> Optional[List[BlameLine]]:
+        """load_versions(after, up_to): versiyon numarası (after, up_to] aralığındaki
+        versiyonlar, sıralı. Sadece önbellekteki en yakın versiyondan sonrakiler yüklenir."""
+        base_version, blame = self._nearest(article_id, version_number)
+        if base_version and base_version == version_number:
+            return blame
+
+        versions = load_versions(base_version, version_number)
+        if not versions or versions[-1]['version_number'] != version_number:
+            return None
+        for version in versions:
+            blame = derive_blame(blame, version['content'].split('\n'), version['version_number'], version['user_id'])
+            self.put((article_id, version['version_number']), blame)
+        return blame
+
+blame_cache = BlameCache()
@@ -1,54 +1,613 @@
 import json
+import mmap
 import os
+import pickle
+import shutil
+import threading
+import time
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 import uuid
 
+try:
+    import fcntl
+except ImportError:  # Windows: sunucu kilidi uygulanmaz
+    fcntl = None
+
+from acl import ArticleACL
+from article_metadata import compute_metadata, summarize
+from friend_graph import FriendGraph
+from similarity import MinHashLSH, decode_signature, encode_signature, minhash_signature
+from metrics import observe_storage
+from profiling import record_storage_call
+
+# Makale id'sine göre shard'lanan tablolar (makale satırı, versiyonları, geçmişi ve işbirlikleri).
+# article_summaries, articles tablosunun içeriksiz listeleme projeksiyonudur.
+SHARDED_TABLES = ('articles', 'article_summaries', 'article_versions', 'article_history', 'collaborations', 'ai_analyses')
+ARTICLE_KEYED_TABLES = ('articles', 'article_summaries')
+DEFAULT_SHARD_COUNT = int(os.getenv("ARTICLE_SHARDS", "8"))
+SNAPSHOT_FORMAT_VERSION = 1
+
 class JSONStorage:
     def __init__(self):
         self.data_dir = "data"
         self.users_file = os.path.join(self.data_dir, "users.json")
-        self.articles_file = os.path.join(self.data_dir, "articles.json")
-        self.collaborations_file = os.path.join(self.data_dir, "collaborations.json")
         self.friendships_file = os.path.join(self.data_dir, "friendships.json")
-        self.article_history_file = os.path.join(self.data_dir, "article_history.json")
         self.notifications_file = os.path.join(self.data_dir, "notifications.json")
-        self.article_versions_file = os.path.join(self.data_dir, "article_versions.json")
+        
+        # Makaleye bağlı veriler data/shards/<n>/<tablo>.json altında tutulur
+        self.shards_dir = os.path.join(self.data_dir, "shards")
+        self.shard_meta_file = os.path.join(self.shards_dir, "meta.json")
+        
+        # Ayrıştırılmış tabloların bellek önbelleği: yol -> (dosya imzası, satırlar).
+        # Dosya imzası değişmişse (başka süreç yazdıysa) JSON'dan yeniden okunur.
+        self.snapshot_file = os.path.join(self.data_dir, "snapshot.bin")
+        # Çalışan sunucu süreçleri bu dosyada paylaşımlı kilit tutar (bkz. hold_server_lock)
+        self.server_lock_file = os.path.join(self.data_dir, "server.lock")
+        self._server_lock_handle = None
+        self._cache: Dict[str, tuple] = {}
+        
+        # Kullanıcı id indeksi (users.json imzası değişince yeniden kurulur)
+        self._user_index: Dict[int, Dict] = {}
+        self._user_index_signature = None
+        
+        # Arkadaşlık/ortak yazarlık grafiği, açılışta (warm_up) veya ilk kullanımda kurulur
+        self._friend_graph: Optional[FriendGraph] = None
+        self._friend_graph_lock = threading.Lock()
+        self._friendships_lock = threading.Lock()
+        # notifications.json oku-değiştir-yaz işlemleri (arka plan işleri paralel bildirim yazar)
+        self._notifications_lock = threading.Lock()
+        
+        # Kullanıcı başına sahip/işbirlikçi makale id'leri ve genel makaleler, açılışta veya ilk kullanımda kurulur
+        self._acl: Optional[ArticleACL] = None
+        self._acl_lock = threading.Lock()
+        
+        # Yakın kopya tespiti için MinHash/LSH indeksi, açılışta veya ilk kullanımda kurulur
+        self._similarity_index: Optional[MinHashLSH] = None
+        self._similarity_index_lock = threading.Lock()
+        
+        # Shard'lar arası tekil id'ler için sayaçlar (ilk kullanımda hesaplanır)
+        self._sequences: Dict[str, int] = {}
+        self._sequence_lock = threading.Lock()
         
         # Data klasörünü oluştur
         os.makedirs(self.data_dir, exist_ok=True)
         
         # Dosyaları oluştur (eğer yoksa)
         self._init_files()
+        self._init_shards()
     
     def _init_files(self):
         """Dosyaları başlangıç durumunda oluştur"""
         files = [
             (self.users_file, []),
-            (self.articles_file, []),
-            (self.collaborations_file, []),
             (self.friendships_file, []),
-            (self.article_history_file, []),
-            (self.notifications_file, []),
-            (self.article_versions_file, [])
+            (self.notifications_file, [])
         ]
         
         for file_path, default_data in files:
             if not os.path.exists(file_path):
                 self._write_json(file_path, default_data)
     
-    def _read_json(self, file_path: str) -> List[Dict]:
-        """JSON dosyasını oku"""
+    def _init_shards(self):
+        """Shard dizinlerini hazırla; eski tek dosyalı veri varsa shard'lara taşı"""
+        meta = self._read_shard_meta()
+        if meta is None:
+            meta = {'shard_count': DEFAULT_SHARD_COUNT}
+            os.makedirs(self.shards_dir, exist_ok=True)
+            self._migrate_legacy_files(meta['shard_count'])
+            self._write_json(self.shard_meta_file, meta)
+        
+        self.shard_count = meta['shard_count']
+        self._shard_locks = [threading.RLock() for _ in range(self.shard_count)]
+        for shard in range(self.shard_count):
+            os.makedirs(self._shard_dir(shard), exist_ok=True)
+            self._ensure_summaries(shard)
+    
+    def _ensure_summaries(self, shard: int):
+        """Özet projeksiyonu olmayan (eski) shard için projeksiyonu bir kez oluştur"""
+        shard_dir = self._shard_dir(shard)
+        summaries_file = os.path.join(shard_dir, "article_summaries.json")
+        if os.path.exists(summaries_file):
+            return
+        articles = self._read_json(os.path.join(shard_dir, "articles.json"))
+        self._write_json(summaries_file, [summarize(article) for article in articles])
+    
+    def _read_shard_meta(self) -> Optional[Dict]:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(self.shard_meta_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+    
+    def _migrate_legacy_files(self, shard_count: int):
+        """Eski data/<tablo>.json dosyalarını shard'lara dağıt, eski dosyayı yedek olarak bırak"""
+        for table in SHARDED_TABLES:
+            legacy_file = os.path.join(self.data_dir, f"{table}.json")
+            if not os.path.exists(legacy_file):
+                continue
+            self._write_sharded_rows(self.shards_dir, shard_count, table, self._read_json(legacy_file))
+            os.replace(legacy_file, legacy_file + ".pre-shard")
+    
+    # Shard yönlendirme
+    def _shard_for(self, article_id: int) -> int:
+        return article_id % self.shard_count
+    
+    def _shard_dir(self, shard: int, shards_dir: str = None) -> str:
+        return os.path.join(shards_dir or self.shards_dir, f"{shard:03d}")
+    
+    def _shard_file(self, table: str, article_id: int) -> str:
+        return os.path.join(self._shard_dir(self._shard_for(article_id)), f"{table}.json")
+    
+    def _shard_lock(self, article_id: int) -> threading.RLock:
+        return self._shard_locks[self._shard_for(article_id)]
+    
+    @contextmanager
+    def _all_shard_locks(self):
+        """Tüm shard kilitlerini sırayla al (tüm shard'ları tutarlı okumak için)"""
+        with ExitStack() as stack:
+            for lock in self._shard_locks:
+                stack.enter_context(lock)
+            yield
+    
+    def _all_shard_files(self, table: str) -> List[str]:
+        return [os.path.join(self._shard_dir(shard), f"{table}.json") for shard in range(self.shard_count)]
+    
+    def _read_all_shards(self, table: str) -> List[Dict]:
+        rows = []
+        for file_path in self._all_shard_files(table):
+            rows.extend(self._read_json(file_path))
+        return rows
+    
+    def _write_sharded_rows(self, shards_dir: str, shard_count: int, table: str, rows: List[Dict]):
+        """Satırları article_id'ye göre verilen shard düzenine yaz"""
+        buckets: Dict[int, List[Dict]] = {shard: [] for shard in range(shard_count)}
+        for row in rows:
+            article_id = row['id'] if table in ARTICLE_KEYED_TABLES else row['article_id']
+            buckets[article_id % shard_count].append(row)
+        for shard, shard_rows in buckets.items():
+            shard_dir = self._shard_dir(shard, shards_dir)
+            os.makedirs(shard_dir, exist_ok=True)
+            self._write_json(os.path.join(shard_dir, f"{table}.json"), shard_rows)
+    
+    def _next_id(self, table: str) -> int:
+        """Tablo için tekil yeni id üret (shard'lanmış tablolarda tüm shard'larda)"""
+        with self._sequence_lock:
+            if table not in self._sequences:
+                rows = (self._read_all_shards(table) if table in SHARDED_TABLES
+                        else self._read_json(os.path.join(self.data_dir, f"{table}.json")))
+                self._sequences[table] = max((row['id'] for row in rows), default=0)
+            self._sequences[table] += 1
+            return self._sequences[table]
+    
+    def rebalance_shards(self, new_shard_count: int) -> str:
+        """Veriyi yeni shard sayısına göre yeniden dağıt.
+        
+        Yeni düzen ayrı bir dizine yazılır ve tamamlanınca eskisiyle yer
+        değiştirir; eski düzen shards.old-<zaman> olarak bırakılır ve yolu
+        döndürülür. Bu süreçte tüm shard kilitleri tutulur.
+        """
+        if new_shard_count < 1:
+            raise ValueError("Shard sayısı en az 1 olmalı")
+        
+        with self._all_shard_locks():
+            staging_dir = self.shards_dir + ".new"
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+            for table in SHARDED_TABLES:
+                self._write_sharded_rows(staging_dir, new_shard_count, table, self._read_all_shards(table))
+            self._write_json(os.path.join(staging_dir, "meta.json"), {'shard_count': new_shard_count})
+            
+            backup_dir = f"{self.shards_dir}.old-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+            os.replace(self.shards_dir, backup_dir)
+            os.replace(staging_dir, self.shards_dir)
+            self.shard_count = new_shard_count
+            self._shard_locks = [threading.RLock() for _ in range(new_shard_count)]
+        
+        return backup_dir
+    
+    @staticmethod
+    def _table_name(file_path: str) -> str:
+        return os.path.splitext(os.path.basename(file_path))[0]
+    
+    @staticmethod
+    def _file_signature(stat_result: os.stat_result) -> tuple:
+        return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+    
+    def _read_json(self, file_path: str, cache: bool = True) -> List[Dict]:
+        """JSON dosyasını oku (dosya değişmediyse bellekteki kopyadan).
+        
+        cache=False ise güncel önbellek kaydı yine kullanılır ama diskten
+        okunan satırlar önbelleğe eklenmez (tek seferlik taramalar için).
+        """
+        start = time.perf_counter()
+        operation = 'read'
+        nbytes = 0
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                stat_result = os.fstat(f.fileno())
+                signature = self._file_signature(stat_result)
+                cached = self._cache.get(file_path)
+                if cached is not None and cached[0] == signature:
+                    operation = 'cache_hit'
+                    rows = cached[1]
+                else:
+                    nbytes = stat_result.st_size
+                    rows = json.load(f)
+                    if not cache:
+                        return rows
+                    self._cache[file_path] = (signature, rows)
+            # Çağıranlar satırları değiştirebildiği için önbelleğin sığ kopyası döner
+            return [dict(row) for row in rows] if isinstance(rows, list) else rows
         except (FileNotFoundError, json.JSONDecodeError):
             return []
+        finally:
+            duration = time.perf_counter() - start
+            table = self._table_name(file_path)
+            observe_storage(table, operation, nbytes, duration)
+            record_storage_call(table, operation, start, duration, nbytes)
     
     def _write_json(self, file_path: str, data: List[Dict]):
-        """JSON dosyasına yaz"""
-        with open(file_path, 'w', encoding='utf-8') as f:
+        """JSON dosyasına yaz (geçici dosyaya yazıp yer değiştirir, okuyucular yarım dosya görmez)"""
+        start = time.perf_counter()
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            nbytes = f.tell()
+        os.replace(tmp_path, file_path)
+        rows = [dict(row) for row in data] if isinstance(data, list) else data
+        self._cache[file_path] = (self._file_signature(os.stat(file_path)), rows)
+        duration = time.perf_counter() - start
+        table = self._table_name(file_path)
+        observe_storage(table, 'write', nbytes, duration)
+        record_storage_call(table, 'write', start, duration, nbytes)
+    
+    # Binary snapshot
+    def _table_files(self) -> List[str]:
+        files = [self.users_file, self.friendships_file, self.notifications_file]
+        for table in SHARDED_TABLES:
+            files.extend(self._all_shard_files(table))
+        return files
+    
+    def save_snapshot(self) -> int:
+        """Bellekteki güncel tabloları tek bir binary dosyaya yaz, yazılan tablo sayısını döndür.
+        
+        Her tablo, yazıldığı andaki JSON dosyasının imzasıyla saklanır; yükleme
+        sırasında imzası tutmayan tablolar atlanır ve JSON'dan okunur.
+        """
+        tables = {}
+        for file_path, (signature, rows) in list(self._cache.items()):
+            try:
+                if self._file_signature(os.stat(file_path)) == signature:
+                    tables[file_path] = (signature, rows)
+            except FileNotFoundError:
+                continue
+        
+        tmp_path = f"{self.snapshot_file}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': SNAPSHOT_FORMAT_VERSION, 'tables': tables}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.snapshot_file)
+        return len(tables)
+    
+    def load_snapshot(self) -> int:
+        """Binary snapshot'ı tek geçişte belleğe al, geçerli tablo sayısını döndür"""
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    snapshot = pickle.loads(mapped)
+        except (FileNotFoundError, ValueError, pickle.UnpicklingError, EOFError):
+            return 0
+        if snapshot.get('version') != SNAPSHOT_FORMAT_VERSION:
+            return 0
+        
+        loaded = 0
+        for file_path, (signature, rows) in snapshot['tables'].items():
+            try:
+                if self._file_signature(os.stat(file_path)) != signature:
+                    continue
+            except FileNotFoundError:
+                continue
+            self._cache.setdefault(file_path, (signature, rows))
+            loaded += 1
+        return loaded
+    
+    def warm_up(self) -> Dict:
+        """Snapshot'ı yükle, snapshot'ta olmayan tabloları JSON'dan okuyarak önbelleği doldur, bellek içi indeksleri kur"""
+        from_snapshot = self.load_snapshot()
+        from_json = 0
+        for file_path in self._table_files():
+            if file_path not in self._cache and os.path.exists(file_path):
+                self._read_json(file_path)
+                from_json += 1
+        # Bellek içi indeksler istek gelmeden kurulur; ilk istek kurulumu beklemez
+        self.acl
+        self.friend_graph
+        self.similarity_index
+        return {'snapshot_tables': from_snapshot, 'json_tables': from_json}
+    
+    def hold_server_lock(self):
+        """Süreç yaşadığı sürece data dizininde paylaşımlı kilit tut.
+        
+        Sunucu açılışta çağırır; birden fazla worker süreci kilidi birlikte
+        tutabilir. Süreç kapanınca (çökse bile) kilidi işletim sistemi bırakır.
+        """
+        if fcntl is None or self._server_lock_handle is not None:
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        handle = open(self.server_lock_file, 'a')
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH)
+        self._server_lock_handle = handle
+    
+    def server_running(self) -> bool:
+        """Aynı data dizinini kullanan bir sunucu süreci çalışıyor mu"""
+        if fcntl is None or not os.path.exists(self.server_lock_file):
+            return False
+        with open(self.server_lock_file, 'a') as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            return False
+    
+    # Saklama politikası
+    def apply_retention(self, policy) -> Dict:
+        """Saklama politikasını shard shard uygula.
+        
+        Her shard kendi kilidi altında işlenir; diğer shard'lardaki yazmalar beklemez.
+        Bir shard'da hata olursa kaydedilir ve diğer shard'larla devam edilir.
+        """
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        versions_pruned = 0
+        history_pruned = 0
+        failed_shards = []
+        for shard in range(self.shard_count):
+            try:
+                pruned = self._apply_retention_to_shard(shard, policy, now)
+            except Exception as e:
+                # Bozuk bir shard diğer shard'ların seyreltilmesini durdurmaz
+                print(f"Retention shard {shard} hatası: {e}")
+                failed_shards.append(shard)
+                continue
+            versions_pruned += pruned[0]
+            history_pruned += pruned[1]
+        
+        return {
+            'versions_pruned': versions_pruned,
+            'history_pruned': history_pruned,
+            'failed_shards': failed_shards,
+            'duration': time.perf_counter() - start,
+        }
+    
+    def _apply_retention_to_shard(self, shard: int, policy, now: datetime) -> tuple:
+        """Tek bir shard'ı kendi kilidi altında seyreltir; (silinen versiyon, silinen geçmiş) döner"""
+        from retention import thin_history, thin_versions
+        
+        shard_dir = self._shard_dir(shard)
+        with self._shard_locks[shard]:
+            articles = self._read_json(os.path.join(shard_dir, "articles.json"))
+            current_versions = {a['id']: a.get('current_version', 1) for a in articles}
+            
+            versions_pruned = 0
+            versions_file = os.path.join(shard_dir, "article_versions.json")
+            versions = self._read_json(versions_file)
+            kept_versions = thin_versions(policy, versions, current_versions, now)
+            if len(kept_versions) != len(versions):
+                self._write_json(versions_file, kept_versions)
+                versions_pruned = len(versions) - len(kept_versions)
+            
+            history_pruned = 0
+            history_file = os.path.join(shard_dir, "article_history.json")
+            history = self._read_json(history_file)
+            compacted_before = sum(1 for entry in history if entry.get('old_content') is None)
+            kept_history = thin_history(policy, history, now)
+            compacted_after = sum(1 for entry in kept_history if entry.get('old_content') is None)
+            if len(kept_history) != len(history) or compacted_after != compacted_before:
+                self._write_json(history_file, kept_history)
+                history_pruned = len(history) - len(kept_history)
+        return versions_pruned, history_pruned
+    
+    # Toplu dışa/içe aktarma
+    def get_all_article_ids(self) -> List[int]:
+        return sorted(summary['id'] for summary in self._read_all_shards('article_summaries'))
+    
+    def iter_article_records(self, article_ids) -> Iterator[Dict]:
+        """Makaleleri versiyon, geçmiş ve işbirlikçileriyle birlikte tek tek üret.
+        
+        Shard'lar sırayla işlenir ve önbelleğe eklenmeden okunur; önbellekte
+        olmayan shard'lardan bellekte aynı anda sadece birinin kayıtları
+        bulunur. Her kayıt 'type' alanı taşır ve kullanıcı id'lerinin yanında
+        kullanıcı adları da yazılır (içe aktarırken eşleştirmek için).
+        """
+        ids_by_shard: Dict[int, List[int]] = {}
+        for article_id in sorted(set(article_ids)):
+            ids_by_shard.setdefault(self._shard_for(article_id), []).append(article_id)
+        user_index = self._get_user_index()
+        
+        def username(user_id):
+            user = user_index.get(user_id)
+            return user['username'] if user else None
+        
+        for shard, shard_article_ids in sorted(ids_by_shard.items()):
+            shard_dir = self._shard_dir(shard)
+            wanted = set(shard_article_ids)
+            
+            def grouped(table):
+                groups: Dict[int, List[Dict]] = {}
+                for row in self._read_json(os.path.join(shard_dir, f"{table}.json"), cache=False):
+                    if row['article_id'] in wanted:
+                        groups.setdefault(row['article_id'], []).append(row)
+                return groups
+            
+            articles = {a['id']: a for a in self._read_json(os.path.join(shard_dir, "articles.json"), cache=False)
+                        if a['id'] in wanted}
+            versions = grouped('article_versions')
+            history = grouped('article_history')
+            collaborations = grouped('collaborations')
+            
+            for article_id in shard_article_ids:
+                article = articles.get(article_id)
+                if not article:
+                    continue
+                yield dict(article, type='article', author_username=username(article['author_id']))
+                for version in sorted(versions.get(article_id, []), key=lambda v: v['version_number']):
+                    yield dict(version, type='version', username=username(version['user_id']))
+                for entry in history.get(article_id, []):
+                    yield dict(entry, type='history', username=username(entry['user_id']))
+                for collaboration in collaborations.get(article_id, []):
+                    yield dict(collaboration, type='collaborator', username=username(collaboration['user_id']))
+    
+    def import_batch(self, records: List[Dict], id_map: Dict[int, int], owner_id: Optional[int] = None,
+                     match_users: bool = False) -> Dict:
+        """Dışa aktarılmış kayıtları yeni id'lerle tek seferde yaz.
+        
+        match_users False ise (kullanıcı içe aktarması) tüm makaleler, versiyonlar
+        ve geçmiş kayıtları owner_id'ye yazılır, işbirlikçi kayıtları atlanır;
+        böylece içe aktaran kişi başka kullanıcılar adına katkı veya erişim
+        oluşturamaz.
+        
+        match_users True ise (yönetici aracı) kullanıcılar kullanıcı adıyla
+        eşleştirilir: owner_id verilirse tüm makaleler o kullanıcıya ait olur,
+        verilmezse eşleşmeyen makaleler atlanır. Versiyon/geçmiş kullanıcıları
+        eşleşmezse makale sahibine yazılır, eşleşmeyen işbirlikçiler atlanır.
+        
+        id_map eski makale id'lerini yenileriyle eşler ve batch'ler arasında
+        korunur. Kayıtlar önceden `transfer.validate_record` ile doğrulanmış
+        olmalıdır. Her shard için her tablo bir kez okunup bir kez yazılır.
+        """
+        if not match_users and owner_id is None:
+            raise ValueError("Kullanıcı eşleştirmesi olmadan owner_id gerekli")
+        user_ids_by_name = ({user['username']: user_id for user_id, user in self._get_user_index().items()}
+                            if match_users else {})
+        counts = {'articles': 0, 'versions': 0, 'history': 0, 'collaborators': 0, 'skipped': 0}
+        new_articles: Dict[int, Dict] = {}
+        pending: Dict[int, Dict[str, List[Dict]]] = {}
+        
+        def add_row(table, article_id, row):
+            pending.setdefault(self._shard_for(article_id), {}).setdefault(table, []).append(row)
+        
+        for record in records:
+            if record.get('type') != 'article':
+                continue
+            author_id = owner_id if owner_id is not None else user_ids_by_name.get(record.get('author_username'))
+            if author_id is None:
+                counts['skipped'] += 1
+                continue
+            article_id = self._next_id('articles')
+            id_map[record['id']] = article_id
+            article = {
+                'id': article_id,
+                'title': record['title'],
+                'content': record['content'],
+                'author_id': author_id,
+                'is_public': record.get('is_public') or False,
+                'created_at': record.get('created_at') or datetime.utcnow().isoformat(),
+                'updated_at': record.get('updated_at') or datetime.utcnow().isoformat(),
+                'current_version': record.get('current_version') or 1,
+                'contributors': [author_id],
+                'last_editor_id': author_id
+            }
+            article.update(compute_metadata(article['content']))
+            new_articles[article_id] = article
+            counts['articles'] += 1
+        
+        collaborator_keys = set()
+        for record in records:
+            record_type = record.get('type')
+            if record_type == 'article':
+                continue
+            article_id = id_map.get(record.get('article_id'))
+            if article_id is None:
+                counts['skipped'] += 1
+                continue
+            article = new_articles.get(article_id) or self.get_article_by_id(article_id)
+            user_id = user_ids_by_name.get(record.get('username'))
+            
+            if record_type == 'version':
+                user_id = user_id or article['author_id']
+                add_row('article_versions', article_id, {
+                    'id': self._next_id('article_versions'),
+                    'article_id': article_id,
+                    'user_id': user_id,
+                    'content': record['content'],
+                    'version_number': record['version_number'],
+                    'note': record.get('note') or '',
+                    'kind': record.get('kind') or 'auto',
+                    'created_at': record['created_at']
+                })
+                if article_id in new_articles and user_id not in article['contributors']:
+                    article['contributors'].append(user_id)
+                    article['last_editor_id'] = user_id
+                counts['versions'] += 1
+            elif record_type == 'history':
+                add_row('article_history', article_id, {
+                    'id': self._next_id('article_history'),
+                    'article_id': article_id,
+                    'user_id': user_id or article['author_id'],
+                    'action': record.get('action') or 'edit',
+                    'content': record.get('content'),
+                    'old_content': record.get('old_content'),
+                    'timestamp': record['timestamp']
+                })
+                counts['history'] += 1
+            elif record_type == 'collaborator':
+                if not match_users or user_id is None or user_id == article['author_id'] or (article_id, user_id) in collaborator_keys:
+                    counts['skipped'] += 1
+                    continue
+                collaborator_keys.add((article_id, user_id))
+                add_row('collaborations', article_id, {
+                    'id': self._next_id('collaborations'),
+                    'article_id': article_id,
+                    'user_id': user_id,
+                    'created_at': record.get('created_at') or datetime.utcnow().isoformat()
+                })
+                counts['collaborators'] += 1
+            else:
+                counts['skipped'] += 1
+        
+        for article_id, article in new_articles.items():
+            add_row('articles', article_id, article)
+            add_row('article_summaries', article_id, summarize(article))
+        
+        for shard, tables in pending.items():
+            with self._shard_locks[shard]:
+                shard_dir = self._shard_dir(shard)
+                existing_collaborations: List[Dict] = []
+                for table, rows in tables.items():
+                    file_path = os.path.join(shard_dir, f"{table}.json")
+                    existing = self._read_json(file_path)
+                    if table == 'collaborations':
+                        existing_collaborations = list(existing)
+                    existing.extend(rows)
+                    self._write_json(file_path, existing)
+                # Kurulmuş bellek içi indeksler aynı shard kilidi altında güncellenir
+                self._index_imported_rows(tables, new_articles, existing_collaborations)
+        return counts
+    
+    def _index_imported_rows(self, tables: Dict[str, List[Dict]], new_articles: Dict[int, Dict],
+                             existing_collaborations: List[Dict]):
+        """İçe aktarılan satırları kurulmuş ACL ve arkadaşlık indekslerine ekle (shard kilidi tutulurken).
+        
+        MinHash imzaları arka plan işinde hesaplanır (bkz. save_similarity_signature).
+        """
+        for article in tables.get('articles', ()):
+            if self._acl is not None:
+                self._acl.add_article(article['id'], article['author_id'], article['is_public'])
+        
+        members: Dict[int, List[int]] = {}
+        for collaboration in existing_collaborations:
+            members.setdefault(collaboration['article_id'], []).append(collaboration['user_id'])
+        for collaboration in tables.get('collaborations', ()):
+            article_id, user_id = collaboration['article_id'], collaboration['user_id']
+            if self._acl is not None:
+                self._acl.add_collaborator(article_id, user_id)
+            if self._friend_graph is not None:
+                article = new_articles.get(article_id) or self.get_article_by_id(article_id)
+                article_members = members.setdefault(article_id, [])
+                self._friend_graph.add_collaborator(user_id, article_members + [article['author_id']])
+                article_members.append(user_id)
     
     # User işlemleri
     def create_user(self, username: str, email: str, hashed_password: str) -> Dict:
@@ -81,45 +640,73 @@ class JSONStorage:
                 return user
         return None
     
-    def get_user_by_id(self, user_id: int) -> Optional[Dict]:
-        users = self._read_json(self.users_file)
-        for user in users:
-            if user['id'] == user_id:
-                return user
+    def get_user_by_username(self, username: str) -> Optional[Dict]:
+        for user in self._get_user_index().values():
+            if user['username'] == username:
+                return dict(user)
         return None
     
+    def _get_user_index(self) -> Dict[int, Dict]:
+        try:
+            signature = self._file_signature(os.stat(self.users_file))
+        except FileNotFoundError:
+            return {}
+        if signature != self._user_index_signature:
+            users = self._read_json(self.users_file)
+            self._user_index = {user['id']: user for user in users}
+            self._user_index_signature = signature
+        return self._user_index
+    
+    def get_user_by_id(self, user_id: int) -> Optional[Dict]:
+        user = self._get_user_index().get(user_id)
+        return dict(user) if user else None
+    
     # Article işlemleri
     def create_article(self, title: str, content: str, author_id: int, is_public: bool = False) -> Dict:
-        articles = self._read_json(self.articles_file)
-        
+        article_id = self._next_id('articles')
         article = {
-            'id': len(articles) + 1,
+            'id': article_id,
             'title': title,
             'content': content,
             'author_id': author_id,
             'is_public': is_public,
             'created_at': datetime.utcnow().isoformat(),
             'updated_at': datetime.utcnow().isoformat(),
-            'current_version': 1
+            'current_version': 1,
+            'contributors': [author_id],
+            'last_editor_id': author_id
         }
+        article.update(compute_metadata(content))
         
-        articles.append(article)
-        self._write_json(self.articles_file, articles)
-        
-        # İlk versiyonu oluştur
-        self.create_article_version(article['id'], author_id, content, 1, "İlk versiyon")
+        with self._shard_lock(article_id):
+            articles_file = self._shard_file('articles', article_id)
+            articles = self._read_json(articles_file)
+            articles.append(article)
+            self._write_json(articles_file, articles)
+            self._save_summary(article)
+            
+            # İlk versiyonu oluştur
+            self.create_article_version(article['id'], author_id, content, 1, "İlk versiyon")
+            
+            if self._acl is not None:
+                self._acl.add_article(article_id, author_id, is_public)
         
         return article
     
     def get_article_by_id(self, article_id: int) -> Optional[Dict]:
-        articles = self._read_json(self.articles_file)
+        articles = self._read_json(self._shard_file('articles', article_id))
         for article in articles:
             if article['id'] == article_id:
                 return article
         return None
     
     def update_article(self, article_id: int, **kwargs) -> Optional[Dict]:
-        articles = self._read_json(self.articles_file)
+        with self._shard_lock(article_id):
+            return self._update_article_locked(article_id, **kwargs)
+    
+    def _update_article_locked(self, article_id: int, **kwargs) -> Optional[Dict]:
+        articles_file = self._shard_file('articles', article_id)
+        articles = self._read_json(articles_file)
         
         for article in articles:
             if article['id'] == article_id:
@@ -134,59 +721,109 @@ class JSONStorage:
                     # Versiyon oluştur
                     user_id = kwargs.get('user_id', article['author_id'])
                     version_note = kwargs.get('version_note', f"Versiyon {new_version}")
-                    self.create_article_version(article_id, user_id, kwargs['content'], new_version, version_note)
+                    version_kind = kwargs.get('version_kind', 'auto')
+                    self.create_article_version(article_id, user_id, kwargs['content'], new_version, version_note, version_kind)
+                    
+                    # Türetilmiş metadata sadece içerik değişince yeniden hesaplanır
+                    kwargs.update(compute_metadata(kwargs['content']))
+                    contributors = article.get('contributors') or [article['author_id']]
+                    if user_id not in contributors:
+                        contributors = contributors + [user_id]
+                    kwargs['contributors'] = contributors
+                    kwargs['last_editor_id'] = user_id
+                    # Eski içeriğin imzası; yenisi arka plan işinde hesaplanıp yazılır
+                    article.pop('minhash', None)
                 
                 # Diğer alanları güncelle
                 for key, value in kwargs.items():
-                    if key not in ['user_id', 'version_note']:  # Bu alanları article'a kaydetme
+                    if key not in ['user_id', 'version_note', 'version_kind']:  # Bu alanları article'a kaydetme
                         article[key] = value
                 
                 article['updated_at'] = datetime.utcnow().isoformat()
-                self._write_json(self.articles_file, articles)
+                self._write_json(articles_file, articles)
+                self._save_summary(article)
+                if 'is_public' in kwargs and self._acl is not None:
+                    self._acl.set_public(article_id, article['is_public'])
                 return article
         
         return None
     
-    def get_user_articles(self, user_id: int, include_collaborations: bool = True) -> List[Dict]:
-        articles = self._read_json(self.articles_file)
-        user_articles = []
-        
-        for article in articles:
-            if article['author_id'] == user_id:
-                user_articles.append(article)
-            elif include_collaborations:
-                # İşbirlikçi olduğu makaleleri de ekle
-                collaborations = self._read_json(self.collaborations_file)
-                if any(c['article_id'] == article['id'] and c['user_id'] == user_id for c in collaborations):
-                    user_articles.append(article)
+    def _save_summary(self, article: Dict):
+        """Makalenin listeleme projeksiyonunu güncelle (shard kilidi tutulurken çağrılır)"""
+        summaries_file = self._shard_file('article_summaries', article['id'])
+        summaries = [s for s in self._read_json(summaries_file) if s['id'] != article['id']]
+        summaries.append(summarize(article))
+        self._write_json(summaries_file, summaries)
+    
+    @property
+    def acl(self) -> ArticleACL:
+        """Materialize edilmiş erişim listesi (ilk erişimde tablolardan kurulur)"""
+        if self._acl is None:
+            with self._acl_lock:
+                if self._acl is None:
+                    # Kurulum sırasında yazma olmasın: aksi halde kurulum okurken eklenen
+                    # makale/işbirlikçi (henüz _acl None olduğu için) indekse hiç girmez
+                    with self._all_shard_locks():
+                        self._acl = ArticleACL.build(self._read_all_shards('article_summaries'),
+                                                     self._read_all_shards('collaborations'))
+        return self._acl
+    
+    def get_article_access(self, article_id: int, user_id: int) -> Optional[str]:
+        """'owner', 'collaborator', 'public' veya 'none'; makale yoksa None"""
+        return self.acl.access(article_id, user_id)
+    
+    def _articles_by_ids(self, article_ids, table: str = "articles") -> List[Dict]:
+        """Sadece ilgili shard'ları okuyarak satırları id sırasıyla döner"""
+        by_shard: Dict[int, set] = {}
+        for article_id in article_ids:
+            by_shard.setdefault(self._shard_for(article_id), set()).add(article_id)
         
-        return user_articles
+        rows = []
+        for shard, ids in by_shard.items():
+            rows.extend(row for row in self._read_json(os.path.join(self._shard_dir(shard), f"{table}.json"))
+                        if row['id'] in ids)
+        return sorted(rows, key=lambda x: x['id'])
+    
+    def get_user_articles(self, user_id: int, include_collaborations: bool = True, summary: bool = False) -> List[Dict]:
+        """summary=True ise içerik yüklenmeden özet projeksiyonu döner"""
+        article_ids = self.acl.user_article_ids(user_id, include_collaborations)
+        return self._articles_by_ids(article_ids, "article_summaries" if summary else "articles")
     
-    def get_public_articles(self) -> List[Dict]:
-        articles = self._read_json(self.articles_file)
-        return [article for article in articles if article['is_public']]
+    def get_public_articles(self, summary: bool = False) -> List[Dict]:
+        return self._articles_by_ids(self.acl.public_article_ids(), "article_summaries" if summary else "articles")
     
     # Collaboration işlemleri
     def add_collaborator(self, article_id: int, user_id: int) -> bool:
-        collaborations = self._read_json(self.collaborations_file)
-        
-        # Zaten işbirlikçi mi kontrol et
-        if any(c['article_id'] == article_id and c['user_id'] == user_id for c in collaborations):
-            return False
-        
-        collaboration = {
-            'id': len(collaborations) + 1,
-            'article_id': article_id,
-            'user_id': user_id,
-            'created_at': datetime.utcnow().isoformat()
-        }
-        
-        collaborations.append(collaboration)
-        self._write_json(self.collaborations_file, collaborations)
+        with self._shard_lock(article_id):
+            collaborations_file = self._shard_file('collaborations', article_id)
+            collaborations = self._read_json(collaborations_file)
+            
+            # Zaten işbirlikçi mi kontrol et
+            if any(c['article_id'] == article_id and c['user_id'] == user_id for c in collaborations):
+                return False
+            
+            collaboration = {
+                'id': self._next_id('collaborations'),
+                'article_id': article_id,
+                'user_id': user_id,
+                'created_at': datetime.utcnow().isoformat()
+            }
+            
+            collaborations.append(collaboration)
+            self._write_json(collaborations_file, collaborations)
+            if self._acl is not None:
+                self._acl.add_collaborator(article_id, user_id)
+            
+            if self._friend_graph is not None:
+                article = self.get_article_by_id(article_id)
+                members = [c['user_id'] for c in collaborations if c['article_id'] == article_id and c['user_id'] != user_id]
+                if article:
+                    members.append(article['author_id'])
+                self._friend_graph.add_collaborator(user_id, members)
         return True
     
     def get_article_collaborators(self, article_id: int) -> List[Dict]:
-        collaborations = self._read_json(self.collaborations_file)
+        collaborations = self._read_json(self._shard_file('collaborations', article_id))
         article_collaborators = []
         
         for collab in collaborations:
@@ -198,73 +835,177 @@ class JSONStorage:
         return article_collaborators
     
     def is_collaborator(self, article_id: int, user_id: int) -> bool:
-        collaborations = self._read_json(self.collaborations_file)
-        return any(c['article_id'] == article_id and c['user_id'] == user_id for c in collaborations)
+        return self.acl.is_collaborator(article_id, user_id)
     
     # Friendship işlemleri
+    @property
+    def friend_graph(self) -> FriendGraph:
+        """Arkadaşlık ve ortak yazarlık grafiği (ilk erişimde tablolardan kurulur)"""
+        if self._friend_graph is None:
+            with self._friend_graph_lock:
+                if self._friend_graph is None:
+                    with self._all_shard_locks(), self._friendships_lock:
+                        self._friend_graph = self._build_friend_graph()
+        return self._friend_graph
+    
+    def _build_friend_graph(self) -> FriendGraph:
+        members: Dict[int, List[int]] = {}
+        for summary in self._read_all_shards('article_summaries'):
+            members.setdefault(summary['id'], []).append(summary['author_id'])
+        for collaboration in self._read_all_shards('collaborations'):
+            members.setdefault(collaboration['article_id'], []).append(collaboration['user_id'])
+        return FriendGraph.build(self._read_json(self.friendships_file), members.values())
+    
     def add_friend(self, user_id: int, friend_id: int) -> bool:
-        friendships = self._read_json(self.friendships_file)
-        
-        # Zaten arkadaş mı kontrol et
-        if any((f['user_id'] == user_id and f['friend_id'] == friend_id) or 
-               (f['user_id'] == friend_id and f['friend_id'] == user_id) for f in friendships):
-            return False
-        
-        friendship = {
-            'id': len(friendships) + 1,
-            'user_id': user_id,
-            'friend_id': friend_id,
-            'created_at': datetime.utcnow().isoformat()
-        }
-        
-        friendships.append(friendship)
-        self._write_json(self.friendships_file, friendships)
+        graph = self.friend_graph
+        with self._friendships_lock:
+            # Zaten arkadaş mı kontrol et (tablo taraması yerine komşuluk kümesi)
+            if graph.are_friends(user_id, friend_id):
+                return False
+            
+            friendships = self._read_json(self.friendships_file)
+            friendship = {
+                'id': len(friendships) + 1,
+                'user_id': user_id,
+                'friend_id': friend_id,
+                'created_at': datetime.utcnow().isoformat()
+            }
+            
+            friendships.append(friendship)
+            self._write_json(self.friendships_file, friendships)
+            graph.add_friendship(user_id, friend_id)
         return True
     
+    def _users_by_ids(self, user_ids) -> List[Dict]:
+        index = self._get_user_index()
+        return [dict(index[user_id]) for user_id in sorted(user_ids) if user_id in index]
+    
     def get_user_friends(self, user_id: int) -> List[Dict]:
-        friendships = self._read_json(self.friendships_file)
-        friends = []
-        
-        for friendship in friendships:
-            if friendship['user_id'] == user_id:
-                friend = self.get_user_by_id(friendship['friend_id'])
-                if friend:
-                    friends.append(friend)
-            elif friendship['friend_id'] == user_id:
-                friend = self.get_user_by_id(friendship['user_id'])
-                if friend:
-                    friends.append(friend)
+        return self._users_by_ids(self.friend_graph.friends_of(user_id))
+    
+    def get_mutual_friends(self, user_id: int, other_id: int) -> List[Dict]:
+        return self._users_by_ids(self.friend_graph.mutual_friends(user_id, other_id))
+    
+    def get_friend_suggestions(self, user_id: int, limit: int = 10) -> List[Dict]:
+        """Ortak arkadaş ve ortak makale sayısına göre sıralı arkadaş önerileri"""
+        index = self._get_user_index()
+        suggestions = []
+        for candidate_id, shared_friends, shared_collaborations in self.friend_graph.suggestions(user_id, limit):
+            user = index.get(candidate_id)
+            if user:
+                suggestion = dict(user)
+                suggestion['shared_friends'] = shared_friends
+                suggestion['shared_collaborations'] = shared_collaborations
+                suggestions.append(suggestion)
+        return suggestions
+    
+    # Benzer makaleler
+    @property
+    def similarity_index(self) -> MinHashLSH:
+        """Makale içeriklerinin MinHash/LSH indeksi (ilk erişimde tablolardan kurulur)"""
+        if self._similarity_index is None:
+            with self._similarity_index_lock:
+                if self._similarity_index is None:
+                    index = MinHashLSH()
+                    with self._all_shard_locks():
+                        for article in self._read_all_shards('articles'):
+                            if 'minhash' in article:
+                                signature = decode_signature(article['minhash'])
+                            else:
+                                # İmzası saklanmamış eski satırlar
+                                signature = minhash_signature(article['content'])
+                            index.add(article['id'], signature)
+                        self._similarity_index = index
+        return self._similarity_index
+    
+    def save_similarity_signature(self, article_id: int, version_number: int, signature) -> bool:
+        """Arka plan işinin hesapladığı MinHash imzasını makale satırına yazar ve indekse ekler.
         
-        return friends
+        Makale bu arada başka bir versiyona geçtiyse yazmaz ve False döner;
+        o versiyonun işi imzayı ayrıca hesaplar.
+        """
+        with self._shard_lock(article_id):
+            articles_file = self._shard_file('articles', article_id)
+            articles = self._read_json(articles_file)
+            for article in articles:
+                if article['id'] == article_id:
+                    if article.get('current_version', 1) != version_number:
+                        return False
+                    article['minhash'] = encode_signature(signature)
+                    self._write_json(articles_file, articles)
+                    if self._similarity_index is not None:
+                        self._similarity_index.add(article_id, signature)
+                    return True
+        return False
+    
+    def get_similar_articles(self, article_id: int, min_similarity: float = 0.0) -> List[tuple]:
+        """(article_id, tahmini Jaccard benzerliği) listesi, benzerliğe göre azalan"""
+        index = self.similarity_index
+        signature = index.signature_of(article_id)
+        if signature is None:
+            return []
+        return index.query(signature, exclude=article_id, min_similarity=min_similarity)
     
     # Article history işlemleri
-    def add_article_history(self, article_id: int, user_id: int, action: str, content: str, old_content: str = None) -> Dict:
-        history = self._read_json(self.article_history_file)
-        
-        history_entry = {
-            'id': len(history) + 1,
-            'article_id': article_id,
-            'user_id': user_id,
-            'action': action,  # 'edit', 'delete', 'add'
-            'content': content,
-            'old_content': old_content,
-            'timestamp': datetime.utcnow().isoformat()
-        }
+    def add_article_history(self, article_id: int, user_id: int, action: str, content: str, old_content: str = None,
+                            idempotency_key: Optional[str] = None) -> Dict:
+        """Geçmiş kaydı ekle; idempotency_key verilirse aynı anahtarlı kayıt varsa onu döndür.
         
-        history.append(history_entry)
-        self._write_json(self.article_history_file, history)
+        Anahtar satırda saklanır; yeniden denenen arka plan işi ikinci kayıt yazmaz.
+        """
+        with self._shard_lock(article_id):
+            history_file = self._shard_file('article_history', article_id)
+            history = self._read_json(history_file)
+            if idempotency_key is not None:
+                for entry in history:
+                    if entry.get('idempotency_key') == idempotency_key:
+                        return entry
+            
+            history_entry = {
+                'id': self._next_id('article_history'),
+                'article_id': article_id,
+                'user_id': user_id,
+                'action': action,  # 'edit', 'delete', 'add'
+                'content': content,
+                'old_content': old_content,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            if idempotency_key is not None:
+                history_entry['idempotency_key'] = idempotency_key
+            history.append(history_entry)
+            self._write_json(history_file, history)
         return history_entry
     
     def get_article_history(self, article_id: int) -> List[Dict]:
-        history = self._read_json(self.article_history_file)
+        history = self._read_json(self._shard_file('article_history', article_id))
         return [entry for entry in history if entry['article_id'] == article_id]
     
+    # AI ön analizleri
+    def save_ai_analysis(self, article_id: int, version_number: int, analysis_type: str, analysis: str) -> Dict:
+        entry = {
+            'article_id': article_id,
+            'version_number': version_number,
+            'type': analysis_type,
+            'analysis': analysis,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        with self._shard_lock(article_id):
+            analyses_file = self._shard_file('ai_analyses', article_id)
+            # Makale ve tür başına sadece en güncel analiz tutulur
+            analyses = [a for a in self._read_json(analyses_file)
+                        if not (a['article_id'] == article_id and a['type'] == analysis_type)]
+            analyses.append(entry)
+            self._write_json(analyses_file, analyses)
+        return entry
+    
+    def get_ai_analyses(self, article_id: int) -> List[Dict]:
+        analyses = self._read_json(self._shard_file('ai_analyses', article_id))
+        return [a for a in analyses if a['article_id'] == article_id]
+    
     # Notification işlemleri
     def create_notification(self, user_id: int, type: str, title: str, message: str, data: Dict = None) -> Dict:
-        notifications = self._read_json(self.notifications_file)
-        
         notification = {
-            'id': len(notifications) + 1,
+            'id': self._next_id('notifications'),
             'user_id': user_id,
             'type': type,  # 'friend_request', 'article_update', 'collaboration_invite'
             'title': title,
@@ -274,8 +1015,10 @@ class JSONStorage:
             'created_at': datetime.utcnow().isoformat()
         }
         
-        notifications.append(notification)
-        self._write_json(self.notifications_file, notifications)
+        with self._notifications_lock:
+            notifications = self._read_json(self.notifications_file)
+            notifications.append(notification)
+            self._write_json(self.notifications_file, notifications)
         return notification
     
     def get_user_notifications(self, user_id: int, unread_only: bool = False) -> List[Dict]:
@@ -288,27 +1031,29 @@ class JSONStorage:
         return sorted(user_notifications, key=lambda x: x['created_at'], reverse=True)
     
     def mark_notification_read(self, notification_id: int, user_id: int) -> bool:
-        notifications = self._read_json(self.notifications_file)
-        
-        for notification in notifications:
-            if notification['id'] == notification_id and notification['user_id'] == user_id:
-                notification['read'] = True
-                self._write_json(self.notifications_file, notifications)
-                return True
+        with self._notifications_lock:
+            notifications = self._read_json(self.notifications_file)
+            
+            for notification in notifications:
+                if notification['id'] == notification_id and notification['user_id'] == user_id:
+                    notification['read'] = True
+                    self._write_json(self.notifications_file, notifications)
+                    return True
         
         return False
     
     def mark_all_notifications_read(self, user_id: int) -> bool:
-        notifications = self._read_json(self.notifications_file)
-        updated = False
-        
-        for notification in notifications:
-            if notification['user_id'] == user_id and not notification['read']:
-                notification['read'] = True
-                updated = True
-        
-        if updated:
-            self._write_json(self.notifications_file, notifications)
+        with self._notifications_lock:
+            notifications = self._read_json(self.notifications_file)
+            updated = False
+            
+            for notification in notifications:
+                if notification['user_id'] == user_id and not notification['read']:
+                    notification['read'] = True
+                    updated = True
+            
+            if updated:
+                self._write_json(self.notifications_file, notifications)
         
         return updated
     
@@ -325,36 +1070,47 @@ class JSONStorage:
                 results.append(user)
         
         return results[:10]  # En fazla 10 sonuç
-
+    
     # Versiyon kontrol sistemi
-    def create_article_version(self, article_id: int, user_id: int, content: str, version_number: int, note: str = "") -> Dict:
-        """Yeni bir makale versiyonu oluştur"""
-        versions = self._read_json(self.article_versions_file)
+    def create_article_version(self, article_id: int, user_id: int, content: str, version_number: int, note: str = "", kind: str = "auto") -> Dict:
+        """Yeni bir makale versiyonu oluştur
         
+        kind: 'auto' (normal kayıt), 'named' (kullanıcının isim verdiği) veya
+        'restore' (geri yükleme); isimli ve geri yükleme versiyonları saklama
+        politikasıyla silinmez.
+        """
         version = {
-            'id': len(versions) + 1,
+            'id': self._next_id('article_versions'),
             'article_id': article_id,
             'user_id': user_id,
             'content': content,
             'version_number': version_number,
             'note': note,
+            'kind': kind,
             'created_at': datetime.utcnow().isoformat()
         }
         
-        versions.append(version)
-        self._write_json(self.article_versions_file, versions)
+        with self._shard_lock(article_id):
+            versions_file = self._shard_file('article_versions', article_id)
+            versions = self._read_json(versions_file)
+            versions.append(version)
+            self._write_json(versions_file, versions)
         return version
     
-    def get_article_versions(self, article_id: int) -> List[Dict]:
-        """Bir makalenin tüm versiyonlarını getir"""
-        versions = self._read_json(self.article_versions_file)
-        article_versions = [v for v in versions if v['article_id'] == article_id]
+    def get_article_versions(self, article_id: int, after_version: int = 0,
+                             up_to_version: Optional[int] = None, with_user_names: bool = True) -> List[Dict]:
+        """Bir makalenin versiyonlarını getir (isteğe bağlı olarak (after_version, up_to_version] aralığı)"""
+        versions = self._read_json(self._shard_file('article_versions', article_id))
+        article_versions = [v for v in versions if v['article_id'] == article_id
+                            and v['version_number'] > after_version
+                            and (up_to_version is None or v['version_number'] <= up_to_version)]
         
         # Kullanıcı bilgilerini ekle
-        for version in article_versions:
-            user = self.get_user_by_id(version['user_id'])
-            if user:
-                version['user_name'] = user['username']
+        if with_user_names:
+            for version in article_versions:
+                user = self.get_user_by_id(version['user_id'])
+                if user:
+                    version['user_name'] = user['username']
         
         # Versiyon numarasına göre sırala
         article_versions.sort(key=lambda x: x['version_number'])
@@ -362,7 +1118,7 @@ class JSONStorage:
     
     def get_article_version(self, article_id: int, version_number: int) -> Optional[Dict]:
         """Belirli bir versiyonu getir"""
-        versions = self._read_json(self.article_versions_file)
+        versions = self._read_json(self._shard_file('article_versions', article_id))
         
         for version in versions:
             if version['article_id'] == article_id and version['version_number'] == version_number:
@@ -414,5 +1170,26 @@ class JSONStorage:
             'differences': differences
         }
 
+class LazyStorage:
+    """JSONStorage'ı ilk kullanımda oluşturan vekil.
+    
+    Modülü import etmek dosya sistemine dokunmaz; dizinlerin hazırlanması ve
+    eski verinin taşınması ilk storage çağrısında (veya açılıştaki warm_up'ta) olur.
+    """
+    
+    def __init__(self):
+        self._instance: Optional[JSONStorage] = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> JSONStorage:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = JSONStorage()
+        return self._instance
+    
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
 # Global storage instance
-storage = JSONStorage() 
\ No newline at end of file
+storage = LazyStorage() 
\ No newline at end of file
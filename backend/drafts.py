@@ -0,0 +1,261 @@
+"""Makale taslak tamponu.
+
+Otomatik kaydetme ve sık kaydetmeler makaleye doğrudan yazılmaz; makale
+başına tek bir bellek içi taslağın üzerine yazılır. Taslak şu durumlarda
+gerçek bir versiyona dönüştürülür (materialize):
+
+- `DRAFT_IDLE_SECONDS` boyunca yeni güncelleme gelmezse,
+- açık checkpoint istendiğinde (geri yükleme, başka bir kullanıcının
+  kaydetmesi veya taslağı),
+- son versiyondan bu yana taslağa yazılan bayt `DRAFT_MAX_PENDING_BYTES`
+  sınırını aşınca.
+
+Taslağın sahibi kaydettiğinde taslak versiyona dönüştürülmez, kaydedilen
+içerik onu aşar.
+
+Her güncelleme önce küçük bir write-ahead journal'a (satır başına bir JSON)
+eklenir; sunucu yeniden başladığında henüz versiyona dönüşmemiş taslaklar
+journal'dan geri yüklenir. Journal `DRAFT_JOURNAL_MAX_BYTES` boyutunu aşınca
+sadece canlı taslaklarla yeniden yazılır.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+
+DRAFT_JOURNAL_PATH = os.getenv("DRAFT_JOURNAL_PATH", os.path.join("data", "drafts.journal"))
+DRAFT_IDLE_SECONDS = float(os.getenv("DRAFT_IDLE_SECONDS", "30"))
+DRAFT_MAX_PENDING_BYTES = int(os.getenv("DRAFT_MAX_PENDING_BYTES", str(256 * 1024)))
+DRAFT_JOURNAL_MAX_BYTES = int(os.getenv("DRAFT_JOURNAL_MAX_BYTES", str(4 * 1024 * 1024)))
+DRAFT_JOURNAL_FSYNC = os.getenv("DRAFT_JOURNAL_FSYNC", "true").lower() == "true"
+
+draft_updates_total = metrics.registry.counter(
+    "draft_updates_total", "Taslağa yazılan güncellemeler")
+draft_materialized_total = metrics.registry.counter(
+    "draft_materialized_total", "Versiyona dönüştürülen taslaklar", ("reason",))
+draft_discarded_total = metrics.registry.counter(
+    "draft_discarded_total", "Sahibi kaydettiği için versiyonlanmadan bırakılan taslaklar")
+
+
+class DraftBuffer:
+    """article_id -> taslak; materialize geri çağrısı taslağı makaleye yazar"""
+
+    def __init__(self, journal_path: str = DRAFT_JOURNAL_PATH, idle_seconds: float = DRAFT_IDLE_SECONDS,
+                 max_pending_bytes: int = DRAFT_MAX_PENDING_BYTES,
+                 journal_max_bytes: int = DRAFT_JOURNAL_MAX_BYTES):
+        self.journal_path = journal_path
+        self.idle_seconds = idle_seconds
+        self.max_pending_bytes = max_pending_bytes
+        self.journal_max_bytes = journal_max_bytes
+        self._drafts: Dict[int, Dict] = {}
+        self._seq = 0
+        # _lock sadece taslak sözlüğünü ve journal'ı korur ve kısa tutulur;
+        # materialize (storage yazması) makale başına kilit altında yapılır.
+        # Kilit sırası: önce makale kilidi, sonra _lock.
+        self._lock = threading.Lock()
+        self._article_locks: Dict[int, threading.Lock] = {}
+        self._journal = None
+        self._materialize: Optional[Callable[[Dict], None]] = None
+
+    def set_materializer(self, materialize: Callable[[Dict], None]):
+        self._materialize = materialize
+
+    # Journal
+    def _open_journal(self):
+        if self._journal is None:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        return self._journal
+
+    def _append(self, entry: Dict):
+        journal = self._open_journal()
+        journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        journal.flush()
+        if DRAFT_JOURNAL_FSYNC:
+            os.fsync(journal.fileno())
+
+    def _compact_if_needed(self):
+        if self._journal is not None and self._journal.tell() >= self.journal_max_bytes:
+            self._rewrite_journal()
+
+    def _rewrite_journal(self):
+        """Journal'ı sadece canlı taslaklarla atomik olarak yeniden yazar"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for draft in self._drafts.values():
+                f.write(json.dumps({'op': 'draft', **draft}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def recover(self) -> int:
+        """Journal'ı yeniden oynatır; geri yüklenen taslak sayısını döner"""
+        drafts: Dict[int, Dict] = {}
+        done: Dict[int, int] = {}
+        seq = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Çökme anında yarım kalmış son satır
+                        continue
+                    seq = max(seq, entry['seq'])
+                    op = entry.pop('op')
+                    if op == 'draft':
+                        drafts[entry['article_id']] = entry
+                    else:
+                        done[entry['article_id']] = max(done.get(entry['article_id'], 0), entry['seq'])
+        with self._lock:
+            self._seq = seq
+            self._drafts = {article_id: draft for article_id, draft in drafts.items()
+                            if draft['seq'] > done.get(article_id, 0)}
+            self._rewrite_journal()
+            return len(self._drafts)
+
+    # Taslak işlemleri
+    def _article_lock(self, article_id: int) -> threading.Lock:
+        with self._lock:
+            lock = self._article_locks.get(article_id)
+            if lock is None:
+                lock = self._article_locks[article_id] = threading.Lock()
+            return lock
+
+    def get(self, article_id: int) -> Optional[Dict]:
+        with self._lock:
+            draft = self._drafts.get(article_id)
+            return dict(draft) if draft else None
+
+    def update(self, article_id: int, user_id: int, content: str, title: Optional[str], base_version: int) -> Dict:
+        """Taslağın üzerine yazar; eşik aşılırsa taslağı hemen versiyona dönüştürür.
+
+        Başka bir kullanıcıya ait bekleyen taslak önce kendi adına
+        versiyonlanır, böylece katkılar doğru kişiye atanır.
+        """
+        with self._article_lock(article_id):
+            with self._lock:
+                existing = self._drafts.get(article_id)
+            if existing and existing['user_id'] != user_id:
+                self._materialize_draft(article_id, "user_switch")
+                existing = None
+
+            with self._lock:
+                self._seq += 1
+                draft = {
+                    'article_id': article_id,
+                    'user_id': user_id,
+                    'content': content,
+                    'title': title if title is not None else (existing or {}).get('title'),
+                    'base_version': existing['base_version'] if existing else base_version,
+                    'pending_bytes': (existing['pending_bytes'] if existing else 0) + len(content.encode('utf-8')),
+                    'updates': (existing['updates'] if existing else 0) + 1,
+                    'updated_at': time.time(),
+                    'seq': self._seq
+                }
+                self._append({'op': 'draft', **draft})
+                self._drafts[article_id] = draft
+            draft_updates_total.inc()
+
+            materialized = False
+            if draft['pending_bytes'] >= self.max_pending_bytes:
+                materialized = self._materialize_draft(article_id, "size")
+        with self._lock:
+            self._compact_if_needed()
+        return {**draft, 'materialized': materialized}
+
+    def checkpoint(self, article_id: int, reason: str = "checkpoint") -> bool:
+        """Bekleyen taslağı varsa versiyona dönüştürür"""
+        with self._article_lock(article_id):
+            materialized = self._materialize_draft(article_id, reason)
+        with self._lock:
+            self._compact_if_needed()
+        return materialized
+
+    def discard(self, article_id: int, user_id: int) -> bool:
+        """Taslak bu kullanıcıya aitse versiyona dönüştürmeden bırakır.
+        
+        Kullanıcı kaydettiğinde kendi bekleyen taslağı kaydedilen içerikle
+        aşılır; ayrı bir ara versiyon oluşmaz.
+        """
+        with self._article_lock(article_id), self._lock:
+            draft = self._drafts.get(article_id)
+            if draft is None or draft['user_id'] != user_id:
+                return False
+            del self._drafts[article_id]
+            self._append({'op': 'done', 'article_id': article_id, 'seq': draft['seq']})
+            draft_discarded_total.inc()
+            self._compact_if_needed()
+            return True
+
+    def _materialize_draft(self, article_id: int, reason: str) -> bool:
+        """Çağıran makale kilidini tutar. Storage yazması genel kilit dışında
+        yapılır; farklı makalelerin taslakları birbirini beklemez."""
+        with self._lock:
+            draft = self._drafts.get(article_id)
+        if draft is None:
+            return False
+        # Materialize başarısız olursa taslak tamponda kalır ve yeniden denenir
+        self._materialize(dict(draft))
+        with self._lock:
+            del self._drafts[article_id]
+            self._append({'op': 'done', 'article_id': article_id, 'seq': draft['seq']})
+        draft_materialized_total.inc(reason)
+        return True
+
+    def flush_idle(self, now: Optional[float] = None) -> int:
+        """Boşta kalan taslakları versiyona dönüştürür"""
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [article_id for article_id, draft in self._drafts.items()
+                    if now - draft['updated_at'] >= self.idle_seconds]
+        count = 0
+        for article_id in idle:
+            with self._article_lock(article_id):
+                with self._lock:
+                    draft = self._drafts.get(article_id)
+                # Bu arada yeni güncelleme geldiyse bekle
+                if draft is None or now - draft['updated_at'] < self.idle_seconds:
+                    continue
+                try:
+                    if self._materialize_draft(article_id, "idle"):
+                        count += 1
+                except Exception as e:
+                    print(f"Taslak {article_id} versiyona dönüştürülemedi: {e}")
+        with self._lock:
+            self._compact_if_needed()
+        return count
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+async def draft_flush_loop(buffer: DraftBuffer, interval_seconds: float = 1.0):
+    """Boşta kalan taslakları düzenli aralıklarla versiyona dönüştürür"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await run_in_threadpool(buffer.flush_idle)
+
+
+draft_buffer = DraftBuffer()
+
+draft_pending = metrics.registry.gauge(
+    "drafts_pending", "Versiyona dönüşmeyi bekleyen taslaklar",
+    callback=lambda: {(): float(len(draft_buffer._drafts))})
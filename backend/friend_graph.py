@@ -0,0 +1,93 @@
+"""Arkadaşlık ve ortak yazarlık ilişkileri için bellek içi komşuluk grafiği.
+
+Arkadaşlıklar kullanıcı -> arkadaş kümesi olarak, ortak yazarlık (aynı
+makalede yazar veya işbirlikçi olmak) kullanıcı -> {kullanıcı: ortak makale
+sayısı} olarak tutulur. Sorgular sadece ilgili kullanıcıların komşuluklarına
+dokunur; tüm arkadaşlık tablosunu taramaz.
+"""
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class FriendGraph:
+    def __init__(self):
+        self._friends: Dict[int, Set[int]] = {}
+        self._coauthors: Dict[int, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, friendships: Iterable[Dict], article_members: Iterable[Iterable[int]]) -> "FriendGraph":
+        graph = cls()
+        for friendship in friendships:
+            graph._link(friendship['user_id'], friendship['friend_id'])
+        for members in article_members:
+            members = list(dict.fromkeys(members))
+            for index, user_id in enumerate(members):
+                for other_id in members[index + 1:]:
+                    graph._add_coauthor_pair(user_id, other_id)
+        return graph
+
+    def _link(self, user_id: int, friend_id: int):
+        self._friends.setdefault(user_id, set()).add(friend_id)
+        self._friends.setdefault(friend_id, set()).add(user_id)
+
+    def _add_coauthor_pair(self, user_id: int, other_id: int):
+        if user_id == other_id:
+            return
+        counts = self._coauthors.setdefault(user_id, {})
+        counts[other_id] = counts.get(other_id, 0) + 1
+        counts = self._coauthors.setdefault(other_id, {})
+        counts[user_id] = counts.get(user_id, 0) + 1
+
+    def add_friendship(self, user_id: int, friend_id: int) -> bool:
+        """Arkadaşlığı ekler; zaten arkadaşlarsa False döner"""
+        with self._lock:
+            if friend_id in self._friends.get(user_id, ()):
+                return False
+            self._link(user_id, friend_id)
+            return True
+
+    def add_collaborator(self, user_id: int, existing_members: Iterable[int]):
+        """Makaleye yeni katılan kullanıcıyı mevcut yazar/işbirlikçilerle eşleştirir"""
+        with self._lock:
+            for member_id in set(existing_members):
+                self._add_coauthor_pair(user_id, member_id)
+
+    def are_friends(self, user_id: int, friend_id: int) -> bool:
+        with self._lock:
+            return friend_id in self._friends.get(user_id, ())
+
+    def friends_of(self, user_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._friends.get(user_id, ()))
+
+    def mutual_friends(self, user_id: int, other_id: int) -> Set[int]:
+        with self._lock:
+            first = self._friends.get(user_id, set())
+            second = self._friends.get(other_id, set())
+            # Küçük kümeyi dolaş
+            if len(first) > len(second):
+                first, second = second, first
+            return {friend_id for friend_id in first if friend_id in second}
+
+    def suggestions(self, user_id: int, limit: int = 10) -> List[Tuple[int, int, int]]:
+        """Arkadaşın arkadaşı ve ortak yazarlardan öneriler.
+
+        (kullanıcı id, ortak arkadaş sayısı, ortak makale sayısı) listesi döner;
+        önce ortak arkadaş, sonra ortak makale sayısına göre sıralanır.
+        """
+        with self._lock:
+            friends = self._friends.get(user_id, set())
+            shared_friends: Dict[int, int] = {}
+            for friend_id in friends:
+                for candidate_id in self._friends.get(friend_id, ()):
+                    if candidate_id != user_id and candidate_id not in friends:
+                        shared_friends[candidate_id] = shared_friends.get(candidate_id, 0) + 1
+
+            coauthors = self._coauthors.get(user_id, {})
+            candidates = set(shared_friends)
+            candidates.update(c for c in coauthors if c != user_id and c not in friends)
+
+            ranked = [(c, shared_friends.get(c, 0), coauthors.get(c, 0)) for c in candidates]
+        ranked.sort(key=lambda item: (-item[1], -item[2], item[0]))
+        return ranked[:limit]
@@ -0,0 +1,168 @@
+"""SQLite tabanlı, kalıcı, süreç içi arka plan iş kuyruğu.
+
+Yazma endpoint'leri yan etkileri (bildirim dağıtımı, geçmiş kaydı, AI ön
+analizi) burada kuyruğa alır ve hemen döner; asyncio worker'ları işleri
+thread havuzunda çalıştırır. Başarısız işler üstel bekleme ile yeniden
+denenir, `max_attempts` aşılınca `failed` olarak bırakılır. Aynı
+`idempotency_key` ile ikinci kez kuyruğa alınan iş yok sayılır. Süreç
+çökerse `running` durumda kalan işler açılışta yeniden kuyruğa alınır.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETENTION_SECONDS = 24 * 3600
+
+jobs_processed_total = metrics.registry.counter(
+    "jobs_processed_total", "İşlenen arka plan işleri", ("kind", "outcome"))
+job_duration = metrics.registry.histogram(
+    "job_duration_seconds", "Arka plan işi süresi", ("kind",))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, run_at);
+"""
+
+
+class JobQueue:
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def register(self, kind: str, handler: Callable[[Dict], None]):
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: Dict, idempotency_key: Optional[str] = None, delay: float = 0) -> bool:
+        """İşi kuyruğa alır; aynı anahtarla daha önce alınmışsa False döner"""
+        now = time.time()
+        with self._db_lock:
+            cursor = self._db().execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, idempotency_key, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload, ensure_ascii=False, default=str), idempotency_key, now + delay, now))
+            inserted = cursor.rowcount == 1
+        if inserted and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return inserted
+
+    def pending_count(self) -> int:
+        with self._db_lock:
+            return self._db().execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+
+    def _claim(self) -> Optional[tuple]:
+        with self._db_lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = 'pending' AND run_at <= ? "
+                "ORDER BY run_at, id LIMIT 1", (time.time(),)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1 WHERE id = ?", (row[0],))
+            return row
+
+    def _finish(self, job_id: int, error: Optional[str], attempts: int):
+        now = time.time()
+        with self._db_lock:
+            db = self._db()
+            if error is None:
+                db.execute("UPDATE jobs SET status = 'done', finished_at = ?, last_error = NULL WHERE id = ?", (now, job_id))
+            elif attempts >= self.max_attempts:
+                db.execute("UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ? WHERE id = ?",
+                           (now, error, job_id))
+            else:
+                # Üstel bekleme: 2, 4, 8... saniye
+                db.execute("UPDATE jobs SET status = 'pending', run_at = ?, last_error = ? WHERE id = ?",
+                           (now + 2 ** attempts, error, job_id))
+
+    def _recover_and_prune(self):
+        with self._db_lock:
+            db = self._db()
+            db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+            db.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+
+    def _run(self, kind: str, payload: str):
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise RuntimeError(f"Bilinmeyen iş türü: {kind}")
+        handler(json.loads(payload))
+
+    async def _worker(self):
+        while True:
+            job = await run_in_threadpool(self._claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, kind, payload, attempts = job
+            start = time.perf_counter()
+            error = None
+            try:
+                await run_in_threadpool(self._run, kind, payload)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            job_duration.observe(kind, value=time.perf_counter() - start)
+            jobs_processed_total.inc(kind, "success" if error is None else "error")
+            await run_in_threadpool(self._finish, job_id, error, attempts + 1)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await run_in_threadpool(self._recover_and_prune)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+job_queue = JobQueue()
+
+job_queue_depth = metrics.registry.gauge(
+    "job_queue_depth", "Bekleyen arka plan işi sayısı",
+    callback=lambda: {(): float(job_queue.pending_count())})
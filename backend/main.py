@@ -1,24 +1,48 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import os
 from dotenv import load_dotenv
-import openai
 import uvicorn
 from datetime import datetime, timedelta
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, Depends, status
+from typing import Optional, List, Union
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from jose import JWTError, jwt
 from jose import exceptions as jose_exceptions
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from data_storage import storage
+import acl
+import metrics
+import profiling
+import retention
+import transfer
+from blame import blame_cache
+from job_queue import job_queue
+from drafts import draft_buffer, draft_flush_loop
+from similarity import DUPLICATE_THRESHOLD, minhash_signature
+from renderer import USER_COLORS, render_cache
+from admission import AdmissionControlMiddleware
 
 # .env dosyasını yükle
 load_dotenv()
 
-# OpenAI client'ı başlat
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# OpenAI modülü ağır olduğu için ilk AI çağrısında import edilir
+_openai_module = None
+
+def get_openai():
+    global _openai_module
+    if _openai_module is None:
+        import openai
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        _openai_module = openai
+    return _openai_module
 
 # Pydantic Models
 class UserCreate(BaseModel):
@@ -45,15 +69,49 @@ class ArticleUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
     is_public: Optional[bool] = None
+    version_name: Optional[str] = None  # Verilirse yeni versiyon isimlendirilir ve saklama politikasıyla silinmez
+
+class DraftUpdate(BaseModel):
+    content: str
+    title: Optional[str] = None
 
-class ArticleResponse(BaseModel):
+class DraftResponse(BaseModel):
+    article_id: int
+    user_id: int
+    content: str
+    title: Optional[str] = None
+    base_version: int
+    updates: int
+    updated_at: str
+    materialized: bool = False  # Bu güncellemeyle taslak versiyona dönüştürüldüyse True
+
+class ArticleSummaryResponse(BaseModel):
     id: int
     title: str
-    content: str
     author_id: int
     is_public: bool
     created_at: str
     updated_at: str
+    current_version: int = 1
+    word_count: int = 0
+    excerpt: str = ""
+    reading_time_minutes: int = 0
+    contributors: List[int] = []
+    last_editor_id: Optional[int] = None
+
+class ArticleResponse(ArticleSummaryResponse):
+    content: str
+
+class RenderedArticleResponse(BaseModel):
+    article_id: int
+    version_number: int
+    html: str
+
+class SimilarArticle(BaseModel):
+    id: int
+    title: str
+    author_id: int
+    similarity: float  # Tahmini Jaccard benzerliği (0-1)
 
 class CollaborationCreate(BaseModel):
     user_id: int
@@ -70,6 +128,32 @@ class AIQuestionRequest(BaseModel):
     question: str
 
 app = FastAPI(title="Ortak Makale Platformu", version="1.0.0")
+# Endpoint'ler profil modunda cProfile ile çalıştırılabilsin diye route'lardan önce ayarlanmalı
+app.router.route_class = profiling.ProfiledRoute
+
+# Güvenlik
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+def rate_limit_key(scope: dict) -> str:
+    """Hız sınırı anahtarı: geçerli token varsa kullanıcı id'si, yoksa istemci IP'si"""
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                    if payload.get("sub") is not None:
+                        return f"user:{payload['sub']}"
+                except JWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+# Kabul kontrolü (CORS'un içinde kalmalı ki 429/503 cevapları da CORS başlığı alsın)
+app.add_middleware(AdmissionControlMiddleware, key_func=rate_limit_key)
 
 # CORS ayarları
 app.add_middleware(
@@ -80,20 +164,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Güvenlik
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# İstek bazında profil ve yavaş istek günlüğü
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# İstek metrikleri (en dıştaki middleware, CORS dahil tüm süreyi ölçer)
+app.add_middleware(metrics.MetricsMiddleware)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 # Yardımcı fonksiyonlar
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    with profiling.span("bcrypt", "verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    with profiling.span("bcrypt", "hash"):
+        return pwd_context.hash(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -122,42 +209,61 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     return user
 
 # AI Yardımcı fonksiyonları
+def _chat_completion(operation: str, messages: list, max_tokens: int):
+    """OpenAI çağrısını yapar; süre, hata ve token kullanımını metriklere yazar"""
+    start = time.perf_counter()
+    try:
+        with profiling.span("openai", operation):
+            response = get_openai().chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+    except Exception:
+        metrics.observe_ai_call(operation, time.perf_counter() - start, "error")
+        raise
+    metrics.observe_ai_call(operation, time.perf_counter() - start, "success", getattr(response, "usage", None))
+    return response
+
 def analyze_article_content(content: str, analysis_type: str) -> str:
     """Makale içeriğini AI ile analiz eder"""
     try:
-        if analysis_type == "summary":
-            prompt = f"""Aşağıdaki makaleyi Türkçe olarak özetle. Ana noktaları, konuları ve sonuçları belirt:
+        return run_article_analysis(content, analysis_type)
+    except Exception as e:
+        return f"AI analizi sırasında hata oluştu: {str(e)}"
+
+def run_article_analysis(content: str, analysis_type: str) -> str:
+    """Analizi yapar; hataları yutmaz (arka plan işi yeniden denensin diye)"""
+    if analysis_type == "summary":
+        prompt = f"""Aşağıdaki makaleyi Türkçe olarak özetle. Ana noktaları, konuları ve sonuçları belirt:
 
 Makale:
 {content}
 
 Özet:"""
-        
-        elif analysis_type == "contribution_analysis":
-            prompt = f"""Bu makalede kim hangi kısmı yazmış, analiz et. Kullanıcı etiketlerini ([username - timestamp]) kullanarak her kullanıcının katkısını özetle:
+    
+    elif analysis_type == "contribution_analysis":
+        prompt = f"""Bu makalede kim hangi kısmı yazmış, analiz et. Kullanıcı etiketlerini ([username - timestamp]) kullanarak her kullanıcının katkısını özetle:
 
 Makale:
 {content}
 
 Katkı Analizi:"""
-        
-        else:
-            return "Geçersiz analiz türü"
+    
+    else:
+        return "Geçersiz analiz türü"
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Sen bir makale analiz uzmanısın. Türkçe cevap ver."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content.strip()
+    response = _chat_completion(
+        analysis_type,
+        messages=[
+            {"role": "system", "content": "Sen bir makale analiz uzmanısın. Türkçe cevap ver."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=500
+    )
     
-    except Exception as e:
-        return f"AI analizi sırasında hata oluştu: {str(e)}"
+    return response.choices[0].message.content.strip()
 
 def answer_question(content: str, question: str) -> str:
     """Makale hakkında soru sorar ve cevap verir"""
@@ -171,14 +277,13 @@ Soru: {question}
 
 Cevap:"""
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = _chat_completion(
+            "question",
             messages=[
                 {"role": "system", "content": "Sen bir makale analiz uzmanısın. Verilen makaleyi okuyup soruları Türkçe olarak cevapla."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=400,
-            temperature=0.7
+            max_tokens=400
         )
         
         return response.choices[0].message.content.strip()
@@ -186,7 +291,228 @@ Cevap:"""
     except Exception as e:
         return f"Soru cevaplanırken hata oluştu: {str(e)}"
 
+startup_duration = metrics.registry.gauge(
+    "app_startup_seconds", "Açılış süresi (import ve storage ısınması)", ("phase",))
+
+@app.on_event("startup")
+async def warm_up_storage():
+    """Storage'ı snapshot'tan (yoksa JSON'dan) yükler ve açılış süresini raporlar"""
+    import_seconds = time.perf_counter() - _IMPORT_STARTED
+    start = time.perf_counter()
+    # Komut satırı araçları (workspace_transfer import) sunucu çalışırken reddedilir
+    storage.hold_server_lock()
+    stats = await run_in_threadpool(storage.warm_up)
+    warm_up_seconds = time.perf_counter() - start
+    startup_duration.set("import", value=import_seconds)
+    startup_duration.set("storage_warm_up", value=warm_up_seconds)
+    print(f"Açılış: import {import_seconds * 1000:.0f} ms, storage {warm_up_seconds * 1000:.0f} ms "
+          f"(snapshot: {stats['snapshot_tables']} tablo, JSON: {stats['json_tables']} tablo)")
+
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+
+@app.on_event("startup")
+async def start_retention_job():
+    """Versiyon ve geçmiş seyreltmesini arka plan görevi olarak başlatır (0 ise kapalı)"""
+    if RETENTION_INTERVAL_SECONDS > 0:
+        app.state.retention_task = asyncio.create_task(
+            retention.retention_loop(storage, retention.RetentionPolicy.from_env(), RETENTION_INTERVAL_SECONDS))
+
+@app.on_event("shutdown")
+def save_storage_snapshot():
+    """Bir sonraki açılış tek geçişte yüklensin diye tabloları binary snapshot'a yazar"""
+    storage.save_snapshot()
+
+# Arka plan işleri
+AI_PREANALYSIS = os.getenv("AI_PREANALYSIS", "false").lower() == "true"
+
+def enqueue_edit_side_effects(old_article: dict, updated_article: dict, user: dict):
+    """Düzenleme sonrası yan etkileri kuyruğa alır.
+    
+    İdempotency anahtarları yeni versiyon numarasını içerir; içerik
+    değişmediyse (versiyon artmadıysa) anahtar verilmez.
+    """
+    article_id = updated_article['id']
+    version = updated_article.get('current_version', 1)
+    changed = version != old_article.get('current_version', 1)
+    key_suffix = f"{article_id}:{version}" if changed else None
+    
+    history_key = f"history:{key_suffix}" if changed else None
+    job_queue.enqueue("article_history", {
+        "article_id": article_id,
+        "user_id": user['id'],
+        "content": updated_article['content'],
+        "old_content": old_article['content'],
+        "idempotency_key": history_key
+    }, idempotency_key=history_key)
+    
+    job_queue.enqueue("notify_collaborators", {
+        "article_id": article_id,
+        "article_title": old_article['title'],
+        "updater_id": user['id'],
+        "updater_username": user['username'],
+        "key_suffix": key_suffix
+    }, idempotency_key=f"notify:{key_suffix}" if changed else None)
+    
+    if changed:
+        job_queue.enqueue("render_article", {"article_id": article_id, "version_number": version},
+                          idempotency_key=f"render:{key_suffix}")
+        job_queue.enqueue("similarity_signature", {"article_id": article_id, "version_number": version},
+                          idempotency_key=f"similarity:{key_suffix}")
+    
+    if AI_PREANALYSIS and changed:
+        job_queue.enqueue("ai_preanalysis", {"article_id": article_id, "version_number": version},
+                          idempotency_key=f"ai:{key_suffix}")
+
+def handle_article_history(payload: dict):
+    storage.add_article_history(
+        article_id=payload['article_id'],
+        user_id=payload['user_id'],
+        action='edit',
+        content=payload['content'],
+        old_content=payload['old_content'],
+        # Çökme sonrası yeniden denenen iş aynı kaydı ikinci kez yazmaz
+        idempotency_key=payload.get('idempotency_key')
+    )
+
+def handle_notify_collaborators(payload: dict):
+    """Her işbirlikçi için ayrı bildirim işi açar; böylece yeniden denemeler tekrar bildirim üretmez"""
+    for collaborator in storage.get_article_collaborators(payload['article_id']):
+        if collaborator['id'] == payload['updater_id']:  # Kendine bildirim gönderme
+            continue
+        key_suffix = payload.get('key_suffix')
+        job_queue.enqueue("notification", {
+            "user_id": collaborator['id'],
+            "type": "article_update",
+            "title": "Makale Güncellendi",
+            "message": f"'{payload['article_title']}' makalesi {payload['updater_username']} tarafından güncellendi",
+            "data": {"article_id": payload['article_id'], "article_title": payload['article_title'], "updater_id": payload['updater_id']}
+        }, idempotency_key=f"notification:{key_suffix}:{collaborator['id']}" if key_suffix else None)
+
+def handle_notification(payload: dict):
+    storage.create_notification(**payload)
+
+def _user_color(username: str) -> Optional[str]:
+    user = storage.get_user_by_username(username)
+    return USER_COLORS[user['id'] % len(USER_COLORS)] if user else None
+
+def render_article_version(article: dict, version_number: Optional[int] = None) -> Optional[RenderedArticleResponse]:
+    """Versiyonun HTML'i; (article_id, version_number) önbelleğinden veya blok bazında artımlı render ile"""
+    current_version = article.get('current_version', 1)
+    if version_number is None:
+        version_number = current_version
+    
+    html = render_cache.get(article['id'], version_number)
+    if html is None:
+        if version_number == current_version:
+            content = article['content']
+        else:
+            version = storage.get_article_version(article['id'], version_number)
+            if not version:
+                return None
+            content = version['content']
+        html = render_cache.render(article['id'], version_number, content, _user_color)
+    return RenderedArticleResponse(article_id=article['id'], version_number=version_number, html=html)
+
+def handle_render_article(payload: dict):
+    """Yeni versiyonu görüntüleme isteğinden önce render eder"""
+    article = storage.get_article_by_id(payload['article_id'])
+    if article:
+        render_article_version(article, payload['version_number'])
+
+def handle_similarity_signature(payload: dict):
+    """Versiyonun MinHash imzasını hesaplar ve benzerlik indeksine yazar.
+    
+    notify_duplicates verilmişse yazara görebildiği neredeyse kopya makaleleri bildirir.
+    """
+    article = storage.get_article_by_id(payload['article_id'])
+    if not article:
+        return
+    version_number = payload.get('version_number') or article.get('current_version', 1)
+    if article.get('current_version', 1) != version_number:
+        return  # Yeni versiyonun işi imzayı ayrıca hesaplar
+    if not storage.save_similarity_signature(article['id'], version_number, minhash_signature(article['content'])):
+        return
+    
+    if payload.get('notify_duplicates'):
+        # Kopyala-yapıştır / fork tespiti
+        near_duplicates = _accessible_similar_articles(article['id'], article['author_id'], DUPLICATE_THRESHOLD, limit=5)
+        if near_duplicates:
+            titles = ", ".join(f"'{d.title}'" for d in near_duplicates)
+            job_queue.enqueue("notification", {
+                "user_id": article['author_id'],
+                "type": "near_duplicate",
+                "title": "Benzer Makale Bulundu",
+                "message": f"'{article['title']}' makalesi şu makalelere çok benziyor: {titles}",
+                "data": {"article_id": article['id'], "near_duplicates": [d.model_dump() for d in near_duplicates]}
+            }, idempotency_key=f"near_duplicate:{article['id']}:{version_number}")
+
+def handle_ai_preanalysis(payload: dict):
+    version = storage.get_article_version(payload['article_id'], payload['version_number'])
+    if not version or not version['content'].strip():
+        return
+    # Hata işi başarısız sayar; kuyruk üstel beklemeyle yeniden dener, hata metni analiz olarak saklanmaz
+    analysis = run_article_analysis(version['content'], "summary")
+    storage.save_ai_analysis(payload['article_id'], payload['version_number'], "summary", analysis)
+
+job_queue.register("article_history", handle_article_history)
+job_queue.register("notify_collaborators", handle_notify_collaborators)
+job_queue.register("notification", handle_notification)
+job_queue.register("render_article", handle_render_article)
+job_queue.register("similarity_signature", handle_similarity_signature)
+job_queue.register("ai_preanalysis", handle_ai_preanalysis)
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+# Taslak tamponu
+def materialize_draft(draft: dict):
+    """Taslağı makaleye yazar; içerik değiştiyse yeni versiyon oluşur"""
+    article = storage.get_article_by_id(draft['article_id'])
+    user = storage.get_user_by_id(draft['user_id'])
+    if not article or not user:
+        return
+    
+    update_data = {
+        'content': draft['content'],
+        'user_id': user['id'],
+        'version_note': f"Versiyon {article.get('current_version', 1) + 1}"
+    }
+    if draft.get('title'):
+        update_data['title'] = draft['title']
+    updated_article = storage.update_article(article['id'], **update_data)
+    if updated_article.get('current_version') != article.get('current_version'):
+        enqueue_edit_side_effects(article, updated_article, user)
+
+draft_buffer.set_materializer(materialize_draft)
+
+def _draft_response(draft: dict) -> DraftResponse:
+    return DraftResponse(**{**draft, 'updated_at': datetime.utcfromtimestamp(draft['updated_at']).isoformat()})
+
+@app.on_event("startup")
+async def start_draft_buffer():
+    """Journal'daki taslakları geri yükler ve boşta kalanları versiyonlayan görevi başlatır"""
+    recovered = await run_in_threadpool(draft_buffer.recover)
+    if recovered:
+        print(f"Journal'dan {recovered} taslak geri yüklendi")
+    app.state.draft_flush_task = asyncio.create_task(draft_flush_loop(draft_buffer))
+
+@app.on_event("shutdown")
+async def stop_draft_buffer():
+    # Taslaklar journal'da kalır; bir sonraki açılışta geri yüklenir
+    app.state.draft_flush_task.cancel()
+    draft_buffer.close()
+
 # Routes
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Prometheus text formatında metrikler (thread havuzu durumu event loop içinde okunur)"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/register", response_model=UserResponse)
 def register(user: UserCreate):
     try:
@@ -210,6 +536,40 @@ def login(user_credentials: UserLogin):
 def get_profile(current_user: dict = Depends(get_current_user)):
     return UserResponse(**current_user)
 
+ARTICLE_ACCESS_LEVELS = {
+    "read": (acl.OWNER, acl.COLLABORATOR, acl.PUBLIC),
+    "member": (acl.OWNER, acl.COLLABORATOR),
+    "owner": (acl.OWNER,),
+}
+
+def require_article_access(article_id: int, user_id: int, level: str = "read",
+                           detail: str = "Bu makaleye erişim izniniz yok"):
+    """Makale satırı okunmadan, materialize edilmiş ACL üzerinden O(1) yetki kontrolü.
+    
+    level: "read" (genel makale, sahip veya işbirlikçi), "member" (sahip veya
+    işbirlikçi), "owner" (sadece sahip)
+    """
+    access = storage.get_article_access(article_id, user_id)
+    if access is None:
+        raise HTTPException(status_code=404, detail="Makale bulunamadı")
+    if access not in ARTICLE_ACCESS_LEVELS[level]:
+        raise HTTPException(status_code=403, detail=detail)
+
+def _accessible_similar_articles(article_id: int, user_id: int, min_similarity: float, limit: int) -> List[SimilarArticle]:
+    """Kullanıcının görebildiği benzer makaleler (özel makalelerin varlığı sızdırılmaz)"""
+    results = []
+    for similar_id, similarity in storage.get_similar_articles(article_id, min_similarity):
+        if storage.get_article_access(similar_id, user_id) in (None, acl.NONE):
+            continue
+        similar = storage.get_article_by_id(similar_id)
+        if not similar:
+            continue
+        results.append(SimilarArticle(id=similar_id, title=similar['title'],
+                                      author_id=similar['author_id'], similarity=similarity))
+        if len(results) >= limit:
+            break
+    return results
+
 @app.post("/articles", response_model=ArticleResponse)
 def create_article(article: ArticleCreate, current_user: dict = Depends(get_current_user)):
     db_article = storage.create_article(
@@ -218,31 +578,37 @@ def create_article(article: ArticleCreate, current_user: dict = Depends(get_curr
         author_id=current_user['id'],
         is_public=article.is_public
     )
-    return ArticleResponse(**db_article)
+    job_queue.enqueue("render_article", {"article_id": db_article['id'], "version_number": 1},
+                      idempotency_key=f"render:{db_article['id']}:1")
+    # İmza içerikle orantılı maliyetlidir; neredeyse kopyalar yazara bildirimle iletilir
+    job_queue.enqueue("similarity_signature", {"article_id": db_article['id'], "version_number": 1,
+                                               "notify_duplicates": True},
+                      idempotency_key=f"similarity:{db_article['id']}:1")
+    return db_article
 
-@app.get("/articles", response_model=List[ArticleResponse])
+@app.get("/articles", response_model=Union[List[ArticleResponse], List[ArticleSummaryResponse]])
 def get_articles(
     current_user: dict = Depends(get_current_user),
-    public_only: bool = False
+    public_only: bool = False,
+    fields: Optional[str] = None
 ):
+    # fields=summary: içerik okunmadan ve gönderilmeden sadece kart bilgileri
+    summary = fields == "summary"
     if public_only:
-        articles = storage.get_public_articles()
+        articles = storage.get_public_articles(summary=summary)
     else:
         # Kullanıcının kendi makaleleri ve işbirliği yaptığı makaleler
-        articles = storage.get_user_articles(current_user['id'])
+        articles = storage.get_user_articles(current_user['id'], summary=summary)
     
+    if summary:
+        return [ArticleSummaryResponse(**article) for article in articles]
     return [ArticleResponse(**article) for article in articles]
 
 @app.get("/articles/{article_id}", response_model=ArticleResponse)
 def get_article(article_id: int, current_user: dict = Depends(get_current_user)):
+    # Erişim kontrolü (ACL)
+    require_article_access(article_id, current_user['id'])
     article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Erişim kontrolü
-    if not article['is_public'] and article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makaleye erişim izniniz yok")
     
     return ArticleResponse(**article)
 
@@ -252,61 +618,125 @@ def update_article(
     article_update: ArticleUpdate, 
     current_user: dict = Depends(get_current_user)
 ):
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makaleyi düzenleme izniniz yok")
     article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-
-    # Yetki kontrolü
-    if article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makaleyi düzenleme izniniz yok")
 
     # Güncelleme
     update_data = article_update.model_dump(exclude_unset=True)
+    version_name = update_data.pop('version_name', None)
+    
+    # Kaydedenin kendi taslağı kaydedilen içerikle aşılır; başka bir kullanıcının
+    # bekleyen taslağı önce kendi versiyonuna dönüşür, kaydedilen içerik onun üzerine yazılır
+    if 'content' in update_data and not draft_buffer.discard(article_id, current_user['id']):
+        if draft_buffer.checkpoint(article_id):
+            article = storage.get_article_by_id(article_id)
     
     # Versiyon kontrolü için user_id ekle
     if 'content' in update_data:
         update_data['user_id'] = current_user['id']
-        update_data['version_note'] = f"Versiyon {article.get('current_version', 1) + 1}"
+        if version_name:
+            update_data['version_note'] = version_name
+            update_data['version_kind'] = 'named'
+        else:
+            update_data['version_note'] = f"Versiyon {article.get('current_version', 1) + 1}"
     
     updated_article = storage.update_article(article_id, **update_data)
 
-    # History kaydet
+    # Makale ve versiyon yazıldı; geçmiş, bildirim ve AI ön analizi arka planda
     if 'content' in update_data:
-        storage.add_article_history(
-            article_id=article_id,
-            user_id=current_user['id'],
-            action='edit',
-            content=update_data['content'],
-            old_content=article['content']
-        )
-        
-        # İşbirlikçilere bildirim gönder
-        collaborators = storage.get_article_collaborators(article_id)
-        for collaborator in collaborators:
-            if collaborator['id'] != current_user['id']:  # Kendine bildirim gönderme
-                storage.create_notification(
-                    user_id=collaborator['id'],
-                    type="article_update",
-                    title="Makale Güncellendi",
-                    message=f"'{article['title']}' makalesi {current_user['username']} tarafından güncellendi",
-                    data={"article_id": article_id, "article_title": article['title'], "updater_id": current_user['id']}
-                )
+        enqueue_edit_side_effects(article, updated_article, current_user)
 
     return ArticleResponse(**updated_article)
 
+@app.get("/articles/{article_id}/rendered", response_model=RenderedArticleResponse)
+def get_rendered_article(
+    article_id: int,
+    version_number: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Makalenin (veya bir versiyonunun) sunucuda render edilmiş, güvenli HTML'i"""
+    # Erişim kontrolü (ACL)
+    require_article_access(article_id, current_user['id'])
+    article = storage.get_article_by_id(article_id)
+    
+    # Eski versiyonlar, versiyon endpoint'leriyle aynı şekilde sadece sahibe ve işbirlikçilere açık
+    if version_number is not None and version_number != article.get('current_version', 1):
+        require_article_access(article_id, current_user['id'], level="member",
+                               detail="Bu makalenin versiyonlarını görme izniniz yok")
+    
+    rendered = render_article_version(article, version_number)
+    if not rendered:
+        raise HTTPException(status_code=404, detail="Versiyon bulunamadı")
+    return rendered
+
+@app.get("/articles/{article_id}/similar", response_model=List[SimilarArticle])
+def get_similar_articles(
+    article_id: int,
+    limit: int = 10,
+    min_similarity: float = 0.3,
+    current_user: dict = Depends(get_current_user)
+):
+    """İçeriği benzeyen makaleler (MinHash/LSH, AI çağrısı yapılmaz)"""
+    # Erişim kontrolü (ACL)
+    require_article_access(article_id, current_user['id'])
+    
+    return _accessible_similar_articles(article_id, current_user['id'], min_similarity, limit)
+
+@app.get("/articles/{article_id}/draft", response_model=Optional[DraftResponse])
+def get_article_draft(article_id: int, current_user: dict = Depends(get_current_user)):
+    """Henüz versiyona dönüşmemiş taslak (yoksa null)"""
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makaleyi düzenleme izniniz yok")
+    
+    draft = draft_buffer.get(article_id)
+    return _draft_response(draft) if draft else None
+
+@app.put("/articles/{article_id}/draft", response_model=DraftResponse)
+def update_article_draft(
+    article_id: int,
+    draft_update: DraftUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Otomatik kaydetme: makaleye yazmadan taslağın üzerine yazar"""
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makaleyi düzenleme izniniz yok")
+    article = storage.get_article_by_id(article_id)
+    
+    draft = draft_buffer.update(
+        article_id,
+        user_id=current_user['id'],
+        content=draft_update.content,
+        title=draft_update.title,
+        base_version=article.get('current_version', 1)
+    )
+    return _draft_response(draft)
+
+@app.post("/articles/{article_id}/checkpoint", response_model=ArticleResponse)
+def checkpoint_article_draft(article_id: int, current_user: dict = Depends(get_current_user)):
+    """Bekleyen taslağı hemen versiyona dönüştürür"""
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makaleyi düzenleme izniniz yok")
+    article = storage.get_article_by_id(article_id)
+    
+    if draft_buffer.checkpoint(article_id):
+        article = storage.get_article_by_id(article_id)
+    return ArticleResponse(**article)
+
 @app.post("/articles/{article_id}/collaborate")
 def add_collaborator(
     article_id: int,
     collaboration: CollaborationCreate,
     current_user: dict = Depends(get_current_user)
 ):
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="owner",
+                           detail="Sadece makale sahibi işbirlikçi ekleyebilir")
     article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    if article['author_id'] != current_user['id']:
-        raise HTTPException(status_code=403, detail="Sadece makale sahibi işbirlikçi ekleyebilir")
     
     # Kullanıcıyı bul
     collaborator = storage.get_user_by_id(collaboration.user_id)
@@ -368,14 +798,8 @@ def get_article_collaborators(
     article_id: int,
     current_user: dict = Depends(get_current_user)
 ):
-    article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Erişim kontrolü
-    if not article['is_public'] and article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makaleye erişim izniniz yok")
+    # Erişim kontrolü (ACL)
+    require_article_access(article_id, current_user['id'])
     
     collaborators = storage.get_article_collaborators(article_id)
     return collaborators
@@ -385,6 +809,25 @@ def get_friends(current_user: dict = Depends(get_current_user)):
     friends = storage.get_user_friends(current_user['id'])
     return friends
 
+def _without_password(user: dict) -> dict:
+    return {key: value for key, value in user.items() if key != 'hashed_password'}
+
+@app.get("/friends/mutual/{user_id}")
+def get_mutual_friends(user_id: int, current_user: dict = Depends(get_current_user)):
+    """Mevcut kullanıcı ile verilen kullanıcının ortak arkadaşları"""
+    if not storage.get_user_by_id(user_id):
+        raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    
+    mutual = storage.get_mutual_friends(current_user['id'], user_id)
+    return [_without_password(user) for user in mutual]
+
+@app.get("/friends/suggestions")
+def get_friend_suggestions(limit: int = 10, current_user: dict = Depends(get_current_user)):
+    """Arkadaşların arkadaşları ve ortak makale yazılan kullanıcılardan öneriler"""
+    limit = max(1, min(limit, 50))
+    suggestions = storage.get_friend_suggestions(current_user['id'], limit)
+    return [_without_password(user) for user in suggestions]
+
 # Notification endpoints
 @app.get("/notifications")
 def get_notifications(
@@ -416,14 +859,9 @@ def get_article_versions(
     current_user: dict = Depends(get_current_user)
 ):
     """Bir makalenin tüm versiyonlarını getir"""
-    article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Yetki kontrolü
-    if article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makalenin versiyonlarını görme izniniz yok")
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makalenin versiyonlarını görme izniniz yok")
     
     versions = storage.get_article_versions(article_id)
     return versions
@@ -435,14 +873,9 @@ def get_article_version(
     current_user: dict = Depends(get_current_user)
 ):
     """Belirli bir versiyonu getir"""
-    article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Yetki kontrolü
-    if article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makalenin versiyonlarını görme izniniz yok")
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makalenin versiyonlarını görme izniniz yok")
     
     version = storage.get_article_version(article_id, version_number)
     if not version:
@@ -458,14 +891,9 @@ def compare_versions(
     current_user: dict = Depends(get_current_user)
 ):
     """İki versiyon arasındaki farkları karşılaştır"""
-    article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Yetki kontrolü
-    if article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makalenin versiyonlarını görme izniniz yok")
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makalenin versiyonlarını görme izniniz yok")
     
     comparison = storage.compare_versions(article_id, version1, version2)
     if "error" in comparison:
@@ -473,6 +901,47 @@ def compare_versions(
     
     return comparison
 
+@app.get("/articles/{article_id}/blame")
+@app.get("/articles/{article_id}/blame/{version_number}")
+def get_article_blame(
+    article_id: int,
+    version_number: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Her satırı, onu getiren versiyon ve kullanıcıyla eşleştirir (varsayılan: güncel versiyon)"""
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makalenin versiyonlarını görme izniniz yok")
+    article = storage.get_article_by_id(article_id)
+    
+    if version_number is None:
+        version_number = article.get('current_version', 1)
+    
+    # Sadece önbellekteki en yakın blame'den sonraki versiyonlar okunur
+    blame = blame_cache.blame(article_id, version_number, lambda after, up_to: storage.get_article_versions(
+        article_id, after_version=after, up_to_version=up_to, with_user_names=False))
+    if blame is None:
+        raise HTTPException(status_code=404, detail="Versiyon bulunamadı")
+    
+    user_names = {}
+    for user_id in {user_id for _, _, user_id in blame}:
+        user = storage.get_user_by_id(user_id)
+        user_names[user_id] = user['username'] if user else None
+    return {
+        "article_id": article_id,
+        "version_number": version_number,
+        "lines": [
+            {
+                "line_number": index + 1,
+                "content": line,
+                "version_number": line_version,
+                "user_id": user_id,
+                "user_name": user_names.get(user_id)
+            }
+            for index, (line, line_version, user_id) in enumerate(blame)
+        ]
+    }
+
 @app.post("/articles/{article_id}/restore/{version_number}")
 def restore_version(
     article_id: int,
@@ -480,29 +949,83 @@ def restore_version(
     current_user: dict = Depends(get_current_user)
 ):
     """Belirli bir versiyonu geri yükle"""
-    article = storage.get_article_by_id(article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Makale bulunamadı")
-    
-    # Yetki kontrolü
-    if article['author_id'] != current_user['id']:
-        if not storage.is_collaborator(article_id, current_user['id']):
-            raise HTTPException(status_code=403, detail="Bu makaleyi düzenleme izniniz yok")
+    # Yetki kontrolü (ACL)
+    require_article_access(article_id, current_user['id'], level="member",
+                           detail="Bu makaleyi düzenleme izniniz yok")
     
     version = storage.get_article_version(article_id, version_number)
     if not version:
         raise HTTPException(status_code=404, detail="Versiyon bulunamadı")
     
+    # Bekleyen taslak geri yüklenen içeriğin üzerine yazılmasın
+    draft_buffer.checkpoint(article_id)
+    
     # Versiyonu geri yükle
     updated_article = storage.update_article(
         article_id, 
         content=version['content'],
         user_id=current_user['id'],
-        version_note=f"Versiyon {version_number} geri yüklendi"
+        version_note=f"Versiyon {version_number} geri yüklendi",
+        version_kind='restore'
     )
+    version = updated_article.get('current_version', 1)
+    job_queue.enqueue("similarity_signature", {"article_id": article_id, "version_number": version},
+                      idempotency_key=f"similarity:{article_id}:{version}")
     
     return ArticleResponse(**updated_article)
 
+@app.get("/articles/{article_id}/analysis")
+def get_article_analysis(article_id: int, current_user: dict = Depends(get_current_user)):
+    """Arka planda hesaplanmış AI ön analizleri (AI_PREANALYSIS açıksa)"""
+    # Erişim kontrolü (ACL)
+    require_article_access(article_id, current_user['id'])
+    
+    return storage.get_ai_analyses(article_id)
+
+# Dışa/içe aktarma endpoint'leri
+@app.get("/export")
+def export_articles(current_user: dict = Depends(get_current_user)):
+    """Kullanıcının makalelerini versiyon, geçmiş ve işbirlikçileriyle NDJSON olarak akıtır"""
+    article_ids = [a['id'] for a in storage.get_user_articles(current_user['id'], summary=True)]
+    filename = f"makaleler-{current_user['username']}-{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+    return StreamingResponse(
+        transfer.export_lines(storage, article_ids, scope="user"),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/import")
+async def import_articles(request: Request, current_user: dict = Depends(get_current_user)):
+    """NDJSON dışa aktarma akışını içe aktarır; makaleler mevcut kullanıcıya ait olur"""
+    importer = transfer.NDJSONImporter(storage, owner_id=current_user['id'])
+    
+    async def feed(lines):
+        for line in lines:
+            batch = importer.feed_line(line)
+            if batch:
+                await run_in_threadpool(importer.commit, batch)
+    
+    buffer = b""
+    try:
+        # Gövde parça parça okunur; bellekte en fazla bir batch tutulur
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            await feed(lines)
+        await feed([buffer])
+        batch = importer.finish()
+        if batch:
+            await run_in_threadpool(importer.commit, batch)
+    except transfer.TransferError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e), "imported": importer.totals})
+    finally:
+        # Commit edilmiş batch'lerdeki makalelerin imzaları arka planda hesaplanır
+        for new_id in importer.id_map.values():
+            job_queue.enqueue("similarity_signature", {"article_id": new_id},
+                              idempotency_key=f"similarity:{new_id}:import")
+    
+    return {"message": "İçe aktarma tamamlandı", "imported": importer.totals, "id_map": importer.id_map}
+
 # AI Analiz Endpoint'leri
 @app.post("/ai/analyze")
 async def analyze_article(
@@ -513,7 +1036,8 @@ async def analyze_article(
     if not request.content.strip():
         raise HTTPException(status_code=400, detail="İçerik boş olamaz")
     
-    analysis = analyze_article_content(request.content, request.analysis_type)
+    # OpenAI çağrısı bloklayıcı; event loop'u (ve okuma endpoint'lerini) tutmasın
+    analysis = await run_in_threadpool(analyze_article_content, request.content, request.analysis_type)
     return {"analysis": analysis, "type": request.analysis_type}
 
 @app.post("/ai/question")
@@ -528,7 +1052,7 @@ async def ask_question(
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Soru boş olamaz")
     
-    answer = answer_question(request.content, request.question)
+    answer = await run_in_threadpool(answer_question, request.content, request.question)
     return {"question": request.question, "answer": answer}
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""Prometheus text formatında basit, bağımlılıksız metrik toplama.
+
+Sayaçlar ve histogramlar etiket değerlerine göre gruplanır; her metriğin
+kendi kilidi vardır ve kayıt işlemi sadece birkaç toplama içerdiği için
+sıcak yoldaki maliyeti ihmal edilebilir düzeydedir.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Saniye cinsinden varsayılan histogram sınırları
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Anlık değer. `callback` verilirse değer her okumada oradan alınır."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        if self._callback is not None:
+            try:
+                items = list(self._callback().items())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [kova sayaçları..., +Inf sayacı, toplam]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, *labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[labels] = state
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return int(sum(state[:-1])) if state else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, state):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {state[-1]}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP metrikleri
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Route bazında HTTP istek süresi", ("method", "route"))
+http_requests_total = registry.counter(
+    "http_requests_total", "Route ve durum koduna göre HTTP istek sayısı", ("method", "route", "status"))
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "İşlenmekte olan HTTP istek sayısı")
+
+# Storage metrikleri
+storage_operations_total = registry.counter(
+    "storage_operations_total", "Tablo bazında okuma/yazma sayısı", ("table", "operation"))
+storage_bytes_total = registry.counter(
+    "storage_bytes_total", "Tablo bazında okunan/yazılan byte miktarı", ("table", "operation"))
+storage_operation_duration = registry.histogram(
+    "storage_operation_duration_seconds", "Tablo bazında okuma/yazma süresi", ("table", "operation"))
+
+# AI metrikleri
+ai_request_duration = registry.histogram(
+    "ai_request_duration_seconds", "OpenAI çağrı süresi", ("operation",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0))
+ai_requests_total = registry.counter(
+    "ai_requests_total", "OpenAI çağrı sayısı", ("operation", "outcome"))
+ai_tokens_total = registry.counter(
+    "ai_tokens_total", "OpenAI token kullanımı", ("operation", "kind"))
+
+
+def _threadpool_state() -> Dict[Tuple[str, ...], float]:
+    """Sync endpoint'lerin çalıştığı AnyIO thread havuzunun doluluğu"""
+    from anyio.to_thread import current_default_thread_limiter
+    try:
+        limiter = current_default_thread_limiter()
+    except RuntimeError:
+        # Event loop dışında okunduğunda
+        return {}
+    return {
+        ("borrowed",): float(limiter.borrowed_tokens),
+        ("total",): float(limiter.total_tokens),
+        ("waiting",): float(limiter.statistics().tasks_waiting),
+    }
+
+
+threadpool_tokens = registry.gauge(
+    "threadpool_tokens", "Thread havuzu kapasitesi, kullanılan ve bekleyen görevler", ("state",),
+    callback=_threadpool_state)
+
+
+def observe_storage(table: str, operation: str, nbytes: int, duration: float):
+    storage_operations_total.inc(table, operation)
+    storage_bytes_total.inc(table, operation, amount=nbytes)
+    storage_operation_duration.observe(table, operation, value=duration)
+
+
+def observe_ai_call(operation: str, duration: float, outcome: str, usage=None):
+    ai_request_duration.observe(operation, value=duration)
+    ai_requests_total.inc(operation, outcome)
+    if usage is not None:
+        ai_tokens_total.inc(operation, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        ai_tokens_total.inc(operation, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+class MetricsMiddleware:
+    """Her isteğin süresini ve durum kodunu route şablonuna göre kaydeden ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            # Ham path yerine route şablonu kullanılır (/articles/{article_id})
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_request_duration.observe(method, route_path, value=duration)
+            http_requests_total.inc(method, route_path, str(status_holder[0]))
@@ -0,0 +1,252 @@
+"""İstek bazında profil çıkarma ve yavaş istek günlüğü.
+
+Profil modu iki şekilde açılır:
+- `X-Profile` başlığı `PROFILE_ADMIN_TOKEN` ile eşleşirse
+- `PROFILE_SAMPLE_RATE` oranında rastgele örnekleme ile
+
+Profillenen isteklerde storage çağrıları (tablo, işlem, süre), bcrypt ve
+OpenAI çağrıları zaman çizelgesine eklenir ve endpoint fonksiyonu cProfile
+ile çalıştırılır. Sonuçlar `PROFILE_DIR` altına `<id>.json` ve `<id>.prof`
+olarak yazılır; profil id'si `X-Profile-Id` başlığıyla döner.
+
+`SLOW_REQUEST_THRESHOLD_MS` tanımlıysa her istek için hafif bir zaman
+çizelgesi tutulur ve eşiği aşan istekler `SLOW_REQUEST_LOG` dosyasına JSON
+satırı olarak yazılır.
+"""
+import asyncio
+import cProfile
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "0"))
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", os.path.join("logs", "slow_requests.log"))
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+slow_request_logger = logging.getLogger("slow_requests")
+
+# Aynı anda tek bir CPU profili alınır: Python 3.12+ sürümlerinde cProfile
+# süreç genelindedir ve ikinci bir enable() ValueError verir; eski sürümlerde
+# aynı thread'deki (event loop) ikinci profiler birincinin hook'unu ezer.
+# Kilit alınamazsa isteğin sadece zaman çizelgesi tutulur.
+_cpu_profiler_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Tek bir isteğin zaman çizelgesi"""
+
+    def __init__(self, method: str, path: str, cpu: bool):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.cpu = cpu
+        self.started_at = time.perf_counter()
+        self.events: List[Dict] = []
+        self.cpu_profiler: Optional[cProfile.Profile] = None
+
+    def record(self, kind: str, name: str, start: float, duration: float, **extra):
+        event = {
+            'kind': kind,
+            'name': name,
+            'offset_ms': round((start - self.started_at) * 1000, 3),
+            'duration_ms': round(duration * 1000, 3),
+        }
+        event.update(extra)
+        # list.append thread-safe olduğu için kilit gerekmiyor
+        self.events.append(event)
+
+    def summary(self) -> Dict:
+        """Olayları tür ve isim bazında toplar (ör. storage/articles: 3 çağrı, 12 ms)"""
+        totals: Dict[str, Dict] = {}
+        for event in self.events:
+            key = f"{event['kind']}:{event['name']}"
+            entry = totals.setdefault(key, {'calls': 0, 'duration_ms': 0.0})
+            entry['calls'] += 1
+            entry['duration_ms'] = round(entry['duration_ms'] + event['duration_ms'], 3)
+        return totals
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+def record_storage_call(table: str, operation: str, start: float, duration: float, nbytes: int):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record('storage', table, start, duration, operation=operation, bytes=nbytes)
+
+
+@contextmanager
+def _span(profile: RequestProfile, kind: str, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(kind, name, start, time.perf_counter() - start)
+
+
+def span(kind: str, name: str):
+    """Aktif profil varsa bloğun süresini zaman çizelgesine ekler"""
+    profile = _current_profile.get()
+    if profile is None:
+        return nullcontext()
+    return _span(profile, kind, name)
+
+
+@contextmanager
+def _endpoint_span(profile: RequestProfile, name: str):
+    profiler = None
+    if profile.cpu and _cpu_profiler_lock.acquire(blocking=False):
+        # Sync endpoint'lerde bu isteğin worker thread'i, async endpoint'lerde
+        # event loop thread'i ölçülür.
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Süreçte başka bir profil aracı aktif
+            profiler = None
+            _cpu_profiler_lock.release()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _cpu_profiler_lock.release()
+            profile.cpu_profiler = profiler
+        profile.record('endpoint', name, start, duration)
+
+
+def _wrap_endpoint(endpoint):
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            with _endpoint_span(profile, endpoint.__name__):
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with _endpoint_span(profile, endpoint.__name__):
+            return endpoint(*args, **kwargs)
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Endpoint fonksiyonunu profil ölçümüyle saran route sınıfı"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+
+def _should_profile(headers: Dict[bytes, bytes]) -> bool:
+    if PROFILE_ADMIN_TOKEN:
+        token = headers.get(b'x-profile')
+        if token is not None and hmac.compare_digest(token.decode('latin-1'), PROFILE_ADMIN_TOKEN):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _dump_profile(profile: RequestProfile, report: Dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile.id)
+    if profile.cpu_profiler is not None:
+        profile.cpu_profiler.dump_stats(base + ".prof")
+        report['cpu_profile'] = base + ".prof"
+    with open(base + ".json", 'w', encoding='utf-8') as f:
+        json.dump(dict(report, events=profile.events), f, ensure_ascii=False, indent=2)
+
+
+def _write_reports(profile: RequestProfile, report: Dict, cpu: bool, is_slow: bool):
+    if cpu:
+        _dump_profile(profile, report)
+    if is_slow:
+        _log_slow_request(report)
+
+
+def _log_slow_request(report: Dict):
+    if not slow_request_logger.handlers:
+        log_dir = os.path.dirname(SLOW_REQUEST_LOG)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        handler = logging.FileHandler(SLOW_REQUEST_LOG, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_request_logger.addHandler(handler)
+        slow_request_logger.setLevel(logging.INFO)
+        slow_request_logger.propagate = False
+    slow_request_logger.info(json.dumps(report, ensure_ascii=False))
+
+
+class ProfilingMiddleware:
+    """Profil ve yavaş istek günlüğü için ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cpu = _should_profile(dict(scope.get("headers") or ()))
+        if not cpu and SLOW_REQUEST_THRESHOLD_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope.get("method", ""), scope.get("path", ""), cpu)
+        token = _current_profile.set(profile)
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                if cpu:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", profile.id.encode()))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            duration_ms = (time.perf_counter() - profile.started_at) * 1000
+            is_slow = SLOW_REQUEST_THRESHOLD_MS > 0 and duration_ms >= SLOW_REQUEST_THRESHOLD_MS
+            if cpu or is_slow:
+                route = scope.get("route")
+                report = {
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'profile_id': profile.id,
+                    'method': profile.method,
+                    'path': profile.path,
+                    'route': getattr(route, "path", None),
+                    'status': status_holder[0],
+                    'duration_ms': round(duration_ms, 3),
+                    'breakdown': profile.summary(),
+                }
+                # Dosya yazmaları event loop'u bloklamasın
+                await run_in_threadpool(_write_reports, profile, report, cpu, is_slow)
@@ -0,0 +1,35 @@
+"""Makale shard'larını yeni shard sayısına göre yeniden dağıtır.
+
+Sunucu durdurulmuşken backend dizininde çalıştırılmalıdır (sunucu çalışıyorsa araç
+hata koduyla çıkar):
+
+    python rebalance_shards.py 16
+"""
+import sys
+
+from data_storage import storage
+
+
+def main():
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print("Kullanım: python rebalance_shards.py <shard_sayisi>")
+        sys.exit(1)
+
+    # Çalışan sunucu eski shard sayısı ve önbellekle yazmaya devam ederdi
+    if storage.server_running():
+        print("Sunucu çalışıyor; shard'ları yeniden dağıtmadan önce durdurun")
+        sys.exit(1)
+
+    new_shard_count = int(sys.argv[1])
+    old_shard_count = storage.shard_count
+    if new_shard_count == old_shard_count:
+        print(f"Shard sayısı zaten {old_shard_count}")
+        return
+
+    backup_dir = storage.rebalance_shards(new_shard_count)
+    print(f"Shard sayısı {old_shard_count} -> {new_shard_count} olarak güncellendi")
+    print(f"Eski düzen yedeği: {backup_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Makale içeriğinin sunucu tarafında güvenli HTML'e dönüştürülmesi.
+
+Editörün ürettiği sözdizimi desteklenir: `#`/`##`/`###` başlıklar, `**kalın**`,
+`*italik*`, `__altı çizili__`, `~~üstü çizili~~`, `> alıntı`, `` `kod` ``,
+`[metin](url)`, `$...$` ve `$$ ... $$` LaTeX, editörün renk span'leri ve
+`[kullanıcı - saat]` etiketleri (etiketten sonraki satırlar o kullanıcının
+rengini alır).
+
+Ham HTML kabul edilmez: tüm metin kaçışlanır, sadece editörün renk
+span'leri (`color: #rrggbb`) ve http(s)/mailto linkleri HTML olarak geçer.
+LaTeX ifadeleri `data-latex` niteliğiyle işaretlenir; dizgiyi tarayıcıda
+KaTeX yapar.
+
+İçerik boş satırlarla bloklara bölünür. Versiyonlar değişmez olduğu için
+sonuç (article_id, version_number) ile önbelleklenir; yeni bir versiyon
+render edilirken aynı makalenin önbellekteki son versiyonunun blokları
+yeniden kullanılır, sadece değişen paragraflar yeniden render edilir.
+"""
+import html
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "512"))
+
+# Frontend'deki kullanıcı renkleriyle aynı (user_id % 6)
+USER_COLORS = ('#FFD700', '#FF4444', '#3B82F6', '#10B981', '#8B5CF6', '#F97316')
+
+_USER_TAG_RE = re.compile(r'^\[([^-\]]+) - ([^\]]+)\](.*)$')
+_HEADING_RE = re.compile(r'^(#{1,3}) (.*)$')
+_COLOR_SPAN_RE = re.compile(
+    r'<span style="color: (#[0-9a-fA-F]{6}); font-weight: bold;">(.*?)</span>', re.DOTALL)
+_CODE_RE = re.compile(r'`([^`\n]+?)`')
+_LATEX_RE = re.compile(r'\$([^$\n]+?)\$')
+_LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_UNDERLINE_RE = re.compile(r'__(.+?)__')
+_ITALIC_RE = re.compile(r'\*(.+?)\*')
+_STRIKE_RE = re.compile(r'~~(.+?)~~')
+_SAFE_URL_RE = re.compile(r'^(https?://|mailto:)', re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+
+# Kullanıcı adı -> renk (bilinmeyen kullanıcı için None)
+ColorResolver = Callable[[str], Optional[str]]
+
+
+def _render_inline(text: str) -> str:
+    """Tek satırın satır içi biçimlendirmesi; girdi ham metin, çıktı güvenli HTML"""
+    protected: List[str] = []
+
+    def protect(fragment: str) -> str:
+        protected.append(fragment)
+        return f"\x00{len(protected) - 1}\x00"
+
+    text = text.replace('\x00', '')
+    # Renk span'lerinin içi ayrıca render edilir; kod ve LaTeX içeriği diğer biçimlendirmelerden korunur
+    text = _COLOR_SPAN_RE.sub(lambda m: protect(
+        f'<span style="color: {m.group(1)}; font-weight: bold;">{_render_inline(m.group(2))}</span>'), text)
+    text = _CODE_RE.sub(lambda m: protect(f"<code>{html.escape(m.group(1))}</code>"), text)
+    text = _LATEX_RE.sub(lambda m: protect(
+        f'<span class="latex-inline" data-latex="{html.escape(m.group(1))}">${html.escape(m.group(1))}$</span>'), text)
+
+    def link(match) -> str:
+        url = match.group(2)
+        if not _SAFE_URL_RE.match(url):
+            return match.group(0)
+        return protect(f'<a href="{html.escape(url)}" target="_blank" rel="noopener noreferrer" '
+                       f'class="text-blue-600 hover:underline">{html.escape(match.group(1))}</a>')
+    text = _LINK_RE.sub(link, text)
+
+    text = html.escape(text, quote=False)
+    text = _BOLD_RE.sub(r'<strong>\1</strong>', text)
+    text = _UNDERLINE_RE.sub(r'<u>\1</u>', text)
+    text = _ITALIC_RE.sub(r'<em>\1</em>', text)
+    text = _STRIKE_RE.sub(r'<del>\1</del>', text)
+    return _PLACEHOLDER_RE.sub(lambda m: protected[int(m.group(1))], text)
+
+
+def split_blocks(content: str) -> List[str]:
+    """İçeriği boş satırlarla ayrılmış bloklara böler; `$$` blokları bölünmez"""
+    blocks: List[str] = []
+    current: List[str] = []
+    in_latex = False
+    for line in content.replace('\r\n', '\n').split('\n'):
+        if line.strip() == '$$':
+            if not in_latex and current:
+                blocks.append('\n'.join(current))
+                current = []
+            current.append(line)
+            if in_latex:
+                blocks.append('\n'.join(current))
+                current = []
+            in_latex = not in_latex
+        elif not in_latex and not line.strip():
+            if current:
+                blocks.append('\n'.join(current))
+                current = []
+        else:
+            current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def render_block(block: str, color: Optional[str], resolve_color: ColorResolver) -> Tuple[str, Optional[str]]:
+    """Bir bloğu render eder.
+
+    color: önceki bloklardan devralınan kullanıcı rengi. (html, bloktan sonra
+    geçerli renk) döner.
+    """
+    lines = block.split('\n')
+    if lines[0].strip() == '$$':
+        latex = '\n'.join(lines[1:-1] if lines[-1].strip() == '$$' and len(lines) > 1 else lines[1:])
+        return f'<div class="latex-block" data-latex="{html.escape(latex)}">$${html.escape(latex)}$$</div>', color
+
+    parts = []
+    for line in lines:
+        tag = _USER_TAG_RE.match(line)
+        if tag:
+            username, timestamp, rest = tag.group(1).strip(), tag.group(2).strip(), tag.group(3)
+            color = resolve_color(username) or color
+            style = f' style="color: {color}"' if color else ''
+            rest_html = f' <span>{_render_inline(rest.strip())}</span>' if rest.strip() else ''
+            parts.append(f'<div class="user-tag"{style}><strong>[{html.escape(username)} - '
+                         f'{html.escape(timestamp)}]</strong>{rest_html}</div>')
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            inner = f'<h{level}>{_render_inline(heading.group(2))}</h{level}>'
+        elif line.startswith('> '):
+            inner = f'<blockquote>{_render_inline(line[2:])}</blockquote>'
+        else:
+            inner = _render_inline(line)
+        style = f' style="color: {color}"' if color else ''
+        parts.append(f'<div{style}>{inner}</div>')
+    return f'<div class="block">{"".join(parts)}</div>', color
+
+
+class RenderedVersion:
+    __slots__ = ('html', 'blocks')
+
+    def __init__(self, html_text: str, blocks: Dict[Tuple[str, Optional[str]], Tuple[str, Optional[str]]]):
+        self.html = html_text
+        # (blok metni, devralınan renk) -> (html, çıkış rengi)
+        self.blocks = blocks
+
+
+class RenderCache:
+    """(article_id, version_number) -> render sonucu, en son kullanılanlar tutulur"""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], RenderedVersion]" = OrderedDict()
+        self._latest: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.blocks_rendered = 0
+        self.blocks_reused = 0
+
+    def get(self, article_id: int, version_number: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((article_id, version_number))
+            if entry is None:
+                return None
+            self._entries.move_to_end((article_id, version_number))
+            return entry.html
+
+    def render(self, article_id: int, version_number: int, content: str, resolve_color: ColorResolver) -> str:
+        cached = self.get(article_id, version_number)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            previous_key = self._latest.get(article_id)
+            previous = self._entries.get(previous_key) if previous_key else None
+            reusable = previous.blocks if previous else {}
+
+        blocks = {}
+        parts = []
+        color = None
+        for block in split_blocks(content):
+            key = (block, color)
+            rendered = reusable.get(key) or blocks.get(key)
+            if rendered is None:
+                rendered = render_block(block, color, resolve_color)
+                self.blocks_rendered += 1
+            else:
+                self.blocks_reused += 1
+            blocks[key] = rendered
+            parts.append(rendered[0])
+            color = rendered[1]
+
+        entry = RenderedVersion('\n'.join(parts), blocks)
+        with self._lock:
+            self._entries[(article_id, version_number)] = entry
+            self._entries.move_to_end((article_id, version_number))
+            latest = self._latest.get(article_id)
+            if latest is None or latest[1] <= version_number:
+                self._latest[article_id] = (article_id, version_number)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._latest.get(evicted[0]) == evicted:
+                    del self._latest[evicted[0]]
+        return entry.html
+
+
+render_cache = RenderCache()
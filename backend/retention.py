@@ -0,0 +1,155 @@
+"""Versiyon ve geçmiş kayıtları için saklama (retention) politikaları.
+
+Varsayılan politika:
+- son 24 saatteki her versiyon saklanır
+- 30 güne kadar her saat için o saatin son versiyonu saklanır
+- daha eskiler için her gün için o günün son versiyonu saklanır
+- isimlendirilmiş ve geri yükleme ile oluşan versiyonlar ile makalenin
+  güncel versiyonu her zaman saklanır
+
+Versiyon numaraları asla yeniden numaralandırılmaz; silinen versiyonlar
+listede boşluk olarak görünür. Geçmiş kayıtları aynı politikayla seyreltilir
+ve tam saklama penceresinin dışındaki kayıtların `old_content` alanı
+(bir önceki kaydın içeriğiyle aynı olduğu için) sıkıştırılarak silinir.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+
+retention_pruned_total = metrics.registry.counter(
+    "retention_pruned_total", "Saklama politikasıyla silinen kayıt sayısı", ("table",))
+retention_run_duration = metrics.registry.histogram(
+    "retention_run_duration_seconds", "Saklama işinin süresi",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0))
+
+PINNED_KINDS = ('named', 'restore')
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Kayıt zamanını (naive UTC) ayrıştırır; ayrıştırılamazsa None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class RetentionPolicy:
+    """Yaşa göre kademeli seyreltme politikası.
+
+    `tiers` (yaş sınırı, kova genişliği) çiftleridir ve yaşa göre sıralıdır.
+    Kova genişliği None ise o kademedeki her kayıt saklanır; yaş sınırı None
+    ise kademe sınırsızdır.
+    """
+
+    def __init__(self, tiers: List[Tuple[Optional[timedelta], Optional[timedelta]]]):
+        self.tiers = tiers
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        keep_all_hours = float(os.getenv("RETENTION_KEEP_ALL_HOURS", "24"))
+        hourly_days = float(os.getenv("RETENTION_HOURLY_DAYS", "30"))
+        return cls([
+            (timedelta(hours=keep_all_hours), None),
+            (timedelta(days=hourly_days), timedelta(hours=1)),
+            (None, timedelta(days=1)),
+        ])
+
+    def _bucket(self, age: timedelta, created_at: datetime) -> Optional[Tuple[int, int]]:
+        """Kaydın düştüğü (kademe, kova) ikilisi; None ise kayıt koşulsuz saklanır"""
+        for index, (max_age, granularity) in enumerate(self.tiers):
+            if max_age is None or age <= max_age:
+                if granularity is None:
+                    return None
+                return index, int(created_at.timestamp() // granularity.total_seconds())
+        return None
+
+    @staticmethod
+    def is_pinned(version: Dict) -> bool:
+        if version.get('kind') in PINNED_KINDS:
+            return True
+        # Eski kayıtlarda geri yükleme sadece notta belirtiliyordu
+        return 'geri yüklendi' in (version.get('note') or '')
+
+    def select(self, rows: List[Dict], timestamp_key: str, now: datetime, keep_ids=()) -> List[Dict]:
+        """Saklanacak satırları döndürür (her kovada en yeni satır kalır)"""
+        newest_in_bucket: Dict[Tuple[int, int], Dict] = {}
+        kept = []
+        for row in rows:
+            created_at = parse_timestamp(row.get(timestamp_key))
+            # Zamanı ayrıştırılamayan satırlar sabitlenmiş sayılır ve saklanır
+            if created_at is None:
+                kept.append(row)
+                continue
+            bucket = self._bucket(now - created_at, created_at)
+            if bucket is None or row['id'] in keep_ids or self.is_pinned(row):
+                kept.append(row)
+                continue
+            current = newest_in_bucket.get(bucket)
+            if current is None or created_at >= current[0]:
+                newest_in_bucket[bucket] = (created_at, row)
+        kept.extend(row for _, row in newest_in_bucket.values())
+        return sorted(kept, key=lambda row: row['id'])
+
+    def keep_all_cutoff(self, now: datetime) -> Optional[datetime]:
+        max_age, granularity = self.tiers[0]
+        if granularity is None and max_age is not None:
+            return now - max_age
+        return None
+
+
+def thin_versions(policy: RetentionPolicy, versions: List[Dict], current_versions: Dict[int, int],
+                  now: datetime) -> List[Dict]:
+    """Bir shard'ın versiyonlarını makale bazında seyreltir"""
+    by_article: Dict[int, List[Dict]] = {}
+    for version in versions:
+        by_article.setdefault(version['article_id'], []).append(version)
+
+    kept = []
+    for article_id, article_versions in by_article.items():
+        current = current_versions.get(article_id)
+        keep_ids = {v['id'] for v in article_versions if v['version_number'] == current}
+        kept.extend(policy.select(article_versions, 'created_at', now, keep_ids))
+    return sorted(kept, key=lambda row: row['id'])
+
+
+def thin_history(policy: RetentionPolicy, history: List[Dict], now: datetime) -> List[Dict]:
+    """Bir shard'ın geçmiş kayıtlarını makale bazında seyreltir ve sıkıştırır"""
+    by_article: Dict[int, List[Dict]] = {}
+    for entry in history:
+        by_article.setdefault(entry['article_id'], []).append(entry)
+
+    kept = []
+    for entries in by_article.values():
+        kept.extend(policy.select(entries, 'timestamp', now))
+
+    cutoff = policy.keep_all_cutoff(now)
+    if cutoff is not None:
+        for entry in kept:
+            timestamp = parse_timestamp(entry.get('timestamp'))
+            if timestamp is not None and timestamp < cutoff and entry.get('old_content') is not None:
+                entry['old_content'] = None
+    return sorted(kept, key=lambda row: row['id'])
+
+
+async def retention_loop(storage, policy: RetentionPolicy, interval_seconds: float):
+    """Saklama politikasını düzenli aralıklarla arka planda uygular"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            stats = await run_in_threadpool(storage.apply_retention, policy)
+        except Exception as e:
+            print(f"Retention hatası: {e}")
+            continue
+        retention_run_duration.observe(value=stats['duration'])
+        retention_pruned_total.inc("article_versions", amount=stats['versions_pruned'])
+        retention_pruned_total.inc("article_history", amount=stats['history_pruned'])
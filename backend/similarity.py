@@ -0,0 +1,155 @@
+"""MinHash imzaları ve bantlı LSH ile yakın kopya makale tespiti.
+
+Makale içeriği etiketlerinden arındırılıp küçük harfe çevrilir ve kelime
+üçlülerine (shingle) bölünür. Her shingle kümesinden `NUM_PERMUTATIONS`
+değerlik bir MinHash imzası çıkarılır; iki imzada eşit değerlerin oranı
+Jaccard benzerliğinin tahminidir.
+
+İmzalar `BANDS` banda bölünür; her bandın özeti bir kovaya düşer. Sorgu
+sadece en az bir bandı aynı kovaya düşen adaylara bakar, tüm makaleleri
+taramaz. 32 bant x 4 satır ile yaklaşık 0.4 Jaccard üzerindeki çiftler
+yüksek olasılıkla aday olur.
+
+İmzalar makale başına ayrı liste yerine tek bir `array('I')` içinde
+tutulur (makale başına 512 bayt); indeksten çıkarılan makalelerin yuvaları yeniden
+kullanılır.
+
+İmza içerik değiştiğinde istek yolunda değil, `similarity_signature` arka plan
+işinde bir kez hesaplanır ve makale satırında base64 olarak (`minhash` alanı)
+saklanır; indeks içerikten değil saklanan imzalardan kurulur.
+"""
+import base64
+import os
+import random
+import re
+import sys
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from article_metadata import plain_text
+
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# Oluştururken bu benzerliğin üzerindeki erişilebilir makaleler yakın kopya olarak işaretlenir
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Sabit tohum: imzalar süreçler arasında karşılaştırılabilir kalır
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(content: str) -> Set[int]:
+    words = _WORD_RE.findall(plain_text(content).lower())
+    # Çok kısa içerik tek bir shingle sayılır
+    count = max(1, len(words) - SHINGLE_SIZE + 1) if words else 0
+    return {zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8')) % _MERSENNE_PRIME for i in range(count)}
+
+
+def minhash_signature(content: str) -> Optional[array]:
+    """İçeriğin MinHash imzası; boş içerik için None"""
+    hashes = shingles(content)
+    if not hashes:
+        return None
+    return array('I', (min([(a * h + b) % _MERSENNE_PRIME for h in hashes]) for a, b in _PERMUTATIONS))
+
+
+def encode_signature(signature: Optional[array]) -> Optional[str]:
+    """İmzanın makale satırında saklanan biçimi (little-endian uint32, base64)"""
+    if signature is None:
+        return None
+    data = array('I', signature)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def decode_signature(encoded: Optional[str]) -> Optional[array]:
+    if not encoded:
+        return None
+    data = array('I')
+    data.frombytes(base64.b64decode(encoded))
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data
+
+
+class MinHashLSH:
+    def __init__(self):
+        self._signatures = array('I')
+        self._slots: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @staticmethod
+    def _band_keys(signature) -> List[int]:
+        return [hash(tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])) for band in range(BANDS)]
+
+    def _signature_at(self, slot: int) -> array:
+        return self._signatures[slot * NUM_PERMUTATIONS:(slot + 1) * NUM_PERMUTATIONS]
+
+    def _remove_locked(self, article_id: int):
+        slot = self._slots.pop(article_id, None)
+        if slot is None:
+            return
+        for band, key in enumerate(self._band_keys(self._signature_at(slot))):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self._buckets[band][key]
+        self._free_slots.append(slot)
+
+    def add(self, article_id: int, signature: Optional[array]):
+        """Makalenin imzasını ekler veya günceller (None ise indeksten çıkarır)"""
+        with self._lock:
+            self._remove_locked(article_id)
+            if signature is None:
+                return
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._signatures[slot * NUM_PERMUTATIONS:(slot + 1) * NUM_PERMUTATIONS] = signature
+            else:
+                slot = len(self._signatures) // NUM_PERMUTATIONS
+                self._signatures.extend(signature)
+            self._slots[article_id] = slot
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, set()).add(article_id)
+
+    def remove(self, article_id: int):
+        with self._lock:
+            self._remove_locked(article_id)
+
+    def signature_of(self, article_id: int) -> Optional[array]:
+        with self._lock:
+            slot = self._slots.get(article_id)
+            return self._signature_at(slot) if slot is not None else None
+
+    def query(self, signature: array, exclude: Optional[int] = None,
+              min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """Aday makaleleri tahmini Jaccard benzerliğine göre azalan sırada döner"""
+        with self._lock:
+            candidates: Set[int] = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates.discard(exclude)
+
+            results = []
+            for article_id in candidates:
+                other = self._signature_at(self._slots[article_id])
+                score = sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERMUTATIONS
+                if score >= min_similarity:
+                    results.append((article_id, score))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
@@ -0,0 +1,160 @@
+"""Makalelerin NDJSON (satır başına bir JSON kaydı) olarak dışa ve içe aktarılması.
+
+Akış bir başlık satırıyla başlar, ardından her makale için sırasıyla
+`article`, `version`, `history` ve `collaborator` kayıtları gelir:
+
+    {"type": "header", "format": 1, "scope": "user", "exported_at": "..."}
+    {"type": "article", "id": 7, "title": "...", "author_username": "ayse", ...}
+    {"type": "version", "article_id": 7, "version_number": 1, "username": "ayse", ...}
+    {"type": "history", "article_id": 7, "action": "edit", ...}
+    {"type": "collaborator", "article_id": 7, "username": "mehmet", ...}
+
+Dışa aktarma tembel bir üreteçtir; içe aktarma kayıtları batch'ler halinde
+toplayıp her batch'i tek bir storage yazmasıyla işler. Kayıtlardaki kullanıcı
+adları sadece yönetici aracında (`match_users=True`) kullanıcılarla
+eşleştirilir; API üzerinden içe aktarmada her şey içe aktaran kullanıcıya yazılır.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from retention import parse_timestamp
+
+EXPORT_FORMAT = 1
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "200"))
+
+
+class TransferError(ValueError):
+    pass
+
+
+# Kayıt türü -> (zorunlu alanlar, isteğe bağlı alanlar); alan -> beklenen tür
+_INT = 'int'
+_STR = 'str'
+_OPTIONAL_STR = 'optional_str'
+_BOOL = 'bool'
+_TIMESTAMP = 'timestamp'
+
+RECORD_FIELDS = {
+    'article': ({'id': _INT, 'title': _STR, 'content': _STR},
+                {'is_public': _BOOL, 'created_at': _TIMESTAMP, 'updated_at': _TIMESTAMP, 'current_version': _INT,
+                 'author_username': _OPTIONAL_STR}),
+    'version': ({'article_id': _INT, 'content': _STR, 'version_number': _INT, 'created_at': _TIMESTAMP},
+                {'note': _OPTIONAL_STR, 'kind': _STR, 'username': _OPTIONAL_STR}),
+    'history': ({'article_id': _INT, 'timestamp': _TIMESTAMP},
+                {'action': _STR, 'content': _OPTIONAL_STR, 'old_content': _OPTIONAL_STR, 'username': _OPTIONAL_STR}),
+    'collaborator': ({'article_id': _INT},
+                     {'created_at': _TIMESTAMP, 'username': _OPTIONAL_STR}),
+}
+
+
+def _valid_value(kind: str, value) -> bool:
+    if kind == _INT:
+        # bool, int'in alt sınıfıdır; id ve versiyon numaraları pozitif olmalı
+        return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+    if kind == _STR:
+        return isinstance(value, str)
+    if kind == _OPTIONAL_STR:
+        return value is None or isinstance(value, str)
+    if kind == _BOOL:
+        return isinstance(value, bool)
+    return parse_timestamp(value) is not None
+
+
+def validate_record(record: Dict):
+    """Kaydın zorunlu alanlarını ve alan türlerini doğrular; hatalıysa TransferError"""
+    fields = RECORD_FIELDS.get(record['type'])
+    if fields is None:
+        # Bilinmeyen kayıt türleri içe aktarmada atlanır
+        return
+    required, optional = fields
+    for field, kind in required.items():
+        if field not in record:
+            raise TransferError(f"'{record['type']}' kaydında '{field}' alanı yok")
+        if not _valid_value(kind, record[field]):
+            raise TransferError(f"'{record['type']}' kaydında '{field}' alanı geçersiz")
+    for field, kind in optional.items():
+        # null değerli isteğe bağlı alanlar verilmemiş sayılır
+        if record.get(field) is not None and not _valid_value(kind, record[field]):
+            raise TransferError(f"'{record['type']}' kaydında '{field}' alanı geçersiz")
+
+
+def export_lines(storage, article_ids: Iterable[int], scope: str) -> Iterator[bytes]:
+    header = {'type': 'header', 'format': EXPORT_FORMAT, 'scope': scope, 'exported_at': datetime.utcnow().isoformat()}
+    yield (json.dumps(header) + "\n").encode('utf-8')
+    for record in storage.iter_article_records(article_ids):
+        yield (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
+
+class NDJSONImporter:
+    """Satırları ayrıştırıp makale sınırlarında batch'lere bölen içe aktarıcı.
+
+    Bir makalenin alt kayıtları her zaman makaleyle aynı batch'e düşer;
+    batch, yeni bir makale satırı geldiğinde ve batch doluysa kapanır.
+    """
+
+    def __init__(self, storage, owner_id: Optional[int] = None, match_users: bool = False,
+                 batch_size: int = IMPORT_BATCH_SIZE):
+        self.storage = storage
+        self.owner_id = owner_id
+        self.match_users = match_users
+        self.batch_size = batch_size
+        self.id_map: Dict[int, int] = {}
+        self.totals = {'articles': 0, 'versions': 0, 'history': 0, 'collaborators': 0, 'skipped': 0}
+        self.line_number = 0
+        self._batch: List[Dict] = []
+        self._batch_articles = 0
+
+    def feed_line(self, line: bytes) -> Optional[List[Dict]]:
+        """Bir satırı işler; commit edilmesi gereken bir batch oluştuysa onu döndürür"""
+        self.line_number += 1
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            raise TransferError(f"{self.line_number}. satır geçerli JSON değil")
+        if not isinstance(record, dict) or 'type' not in record:
+            raise TransferError(f"{self.line_number}. satırda kayıt türü yok")
+
+        if record['type'] == 'header':
+            if record.get('format') != EXPORT_FORMAT:
+                raise TransferError(f"Desteklenmeyen dışa aktarma formatı: {record.get('format')}")
+            return None
+        try:
+            validate_record(record)
+        except TransferError as e:
+            raise TransferError(f"{self.line_number}. satır: {e}")
+
+        ready = None
+        if record['type'] == 'article':
+            if self._batch_articles >= self.batch_size:
+                ready = self._take_batch()
+            self._batch_articles += 1
+        self._batch.append(record)
+        return ready
+
+    def finish(self) -> Optional[List[Dict]]:
+        return self._take_batch() if self._batch else None
+
+    def _take_batch(self) -> List[Dict]:
+        batch, self._batch, self._batch_articles = self._batch, [], 0
+        return batch
+
+    def commit(self, batch: List[Dict]):
+        counts = self.storage.import_batch(batch, self.id_map, self.owner_id, self.match_users)
+        for key, value in counts.items():
+            self.totals[key] += value
+
+    def import_lines(self, lines: Iterable[bytes]) -> Dict:
+        """Senkron içe aktarma (komut satırı aracı için)"""
+        for line in lines:
+            batch = self.feed_line(line)
+            if batch:
+                self.commit(batch)
+        batch = self.finish()
+        if batch:
+            self.commit(batch)
+        return self.totals
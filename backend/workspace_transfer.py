@@ -0,0 +1,51 @@
+"""Tüm çalışma alanını NDJSON olarak dışa/içe aktaran komut satırı aracı.
+
+Backend dizininde çalıştırılmalıdır; içe aktarma sunucu durdurulmuşken yapılır:
+
+    python workspace_transfer.py export yedek.ndjson
+    python workspace_transfer.py import yedek.ndjson [--owner <kullanici_id>]
+
+İçe aktarırken --owner verilmezse makale yazarları kullanıcı adıyla eşleştirilir.
+
+Sunucu çalışırken içe aktarma reddedilir: sunucu id sıralarını bellekte
+tutar (aynı id'ler iki kez atanır) ve ACL, arkadaşlık grafiği ve benzerlik
+indeksi yeni makaleleri görmez. Çalışan sunucuya içe aktarmak için
+`POST /import` kullanılmalıdır. Dışa aktarma sadece okur, sunucu çalışırken
+de yapılabilir.
+"""
+import argparse
+import sys
+
+from data_storage import storage
+import transfer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çalışma alanı dışa/içe aktarma")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("path")
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--owner", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        count = 0
+        with open(args.path, 'wb') as f:
+            for line in transfer.export_lines(storage, storage.get_all_article_ids(), scope="workspace"):
+                f.write(line)
+                count += 1
+        print(f"{count} satır yazıldı: {args.path}")
+    else:
+        if storage.server_running():
+            print("Sunucu çalışıyor; içe aktarmadan önce durdurun veya POST /import kullanın")
+            sys.exit(1)
+        importer = transfer.NDJSONImporter(storage, owner_id=args.owner, match_users=True)
+        with open(args.path, 'rb') as f:
+            totals = importer.import_lines(f)
+        print(f"İçe aktarıldı: {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,7 @@ const ArticleEditor: React.FC = () => {
   const [versions, setVersions] = useState<Version[]>([]);
   const [selectedVersion, setSelectedVersion] = useState<number | null>(null);
   const [showVersions, setShowVersions] = useState(false);
+  const [lastDraftContent, setLastDraftContent] = useState<string | null>(null);
   
   // AI State'leri
   const [showAIPanel, setShowAIPanel] = useState(false);
@@ -88,70 +89,6 @@ const ArticleEditor: React.FC = () => {
     return `[${username} - ${timestamp}]\n${content}\n\n`;
   };
 
-  // İçeriği renklendirme fonksiyonu
-  const renderColoredContent = (content: string) => {
-    if (!content) return '';
-    
-    const lines = content.split('\n');
-    let currentUserColor = '#000000'; // Varsayılan siyah
-    let currentUsername = '';
-
-    const coloredLines = lines.map((line, index) => {
-      // Kullanıcı etiketi kontrolü
-      const userMatch = line.match(/^\[([^-]+) - ([^\]]+)\]/);
-      if (userMatch) {
-        const username = userMatch[1].trim();
-        const timestamp = userMatch[2].trim();
-        
-        // Kullanıcıyı bul ve rengini al
-        const user = collaborators.find(c => c.username === username) || 
-                    (currentUser?.username === username ? currentUser : null);
-        
-        if (user) {
-          currentUserColor = getUserColor(user.id);
-          currentUsername = username;
-        }
-        
-        const contentAfterTag = line.substring(line.indexOf(']') + 1);
-        
-        return (
-          <div key={index} style={{ 
-            padding: '4px 0',
-            margin: '2px 0'
-          }}>
-            <span style={{ color: currentUserColor, fontWeight: 'bold' }}>
-              [{username} - {timestamp}]
-            </span>
-            {contentAfterTag && contentAfterTag.trim() && (
-              <span style={{ color: currentUserColor, marginLeft: '8px' }}>
-                {contentAfterTag}
-              </span>
-            )}
-          </div>
-        );
-      }
-      
-      // Kullanıcı etiketi yoksa, önceki kullanıcının rengini kullan
-      if (line.trim() && currentUsername) {
-        return (
-          <div key={index} style={{ 
-            padding: '2px 0',
-            margin: '1px 0'
-          }}>
-            <span style={{ color: currentUserColor }}>
-              {line}
-            </span>
-          </div>
-        );
-      }
-      
-      // Normal satır
-      return <div key={index}>{line}</div>;
-    });
-    
-    return <div className="whitespace-pre-wrap">{coloredLines}</div>;
-  };
-
   // İçerik değişikliği
   const handleContentChange = (e: React.ChangeEvent<HTMLTextAreaElement>) => {
     setArticle({ ...article, content: e.target.value });
@@ -331,6 +268,28 @@ const ArticleEditor: React.FC = () => {
     fetchCurrentUser();
   }, [id, isEditing]);
 
+  // Taslak otomatik kaydetme: sunucuda taslağın üzerine yazar, her seferinde versiyon oluşturmaz
+  useEffect(() => {
+    if (!isEditing || lastDraftContent === null || article.content === lastDraftContent) return;
+
+    const timeoutId = setTimeout(async () => {
+      try {
+        const token = localStorage.getItem('token');
+        await axios.put(`http://localhost:8080/articles/${id}/draft`, {
+          content: article.content,
+          title: article.title
+        }, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        setLastDraftContent(article.content);
+      } catch (error) {
+        console.error('Taslak kaydedilemedi:', error);
+      }
+    }, 2000);
+
+    return () => clearTimeout(timeoutId);
+  }, [article.content, lastDraftContent]);
+
   // Kullanıcı arama için debounce
   useEffect(() => {
     const timeoutId = setTimeout(() => {
@@ -366,10 +325,16 @@ const ArticleEditor: React.FC = () => {
     
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`http://localhost:8080/articles/${id}`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setArticle(response.data);
+      const headers = { Authorization: `Bearer ${token}` };
+      const response = await axios.get(`http://localhost:8080/articles/${id}`, { headers });
+      // Henüz versiyona dönüşmemiş taslak varsa onunla devam et
+      const draftResponse = await axios.get(`http://localhost:8080/articles/${id}/draft`, { headers });
+      const draft = draftResponse.data;
+      const loaded = draft
+        ? { ...response.data, content: draft.content, title: draft.title || response.data.title }
+        : response.data;
+      setArticle(loaded);
+      setLastDraftContent(loaded.content);
     } catch (error) {
       toast.error('Makale yüklenemedi');
     }
@@ -1,11 +1,11 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { toast } from 'react-hot-toast';
 import { ArrowLeft, Edit, Calendar, User, Users, BookOpen, Eye, History, Share2 } from 'lucide-react';
 import 'katex/dist/katex.min.css';
 // @ts-ignore
-import { InlineMath, BlockMath } from 'react-katex';
+import katex from 'katex';
 
 interface Article {
   id: number;
@@ -39,13 +39,27 @@ const ArticleView: React.FC = () => {
   const [showVersions, setShowVersions] = useState(false);
   const [selectedVersion, setSelectedVersion] = useState<number | null>(null);
   const [articleAuthor, setArticleAuthor] = useState<any>(null);
+  const [renderedHtml, setRenderedHtml] = useState<string>('');
+  const contentRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
     fetchArticle();
+    fetchRendered();
     fetchCollaborators();
     fetchVersions();
   }, [id]);
 
+  // Sunucu LaTeX ifadelerini data-latex ile işaretler; dizgiyi KaTeX yapar
+  useEffect(() => {
+    if (!contentRef.current) return;
+    contentRef.current.querySelectorAll<HTMLElement>('[data-latex]').forEach((element) => {
+      katex.render(element.dataset.latex || '', element, {
+        displayMode: element.classList.contains('latex-block'),
+        throwOnError: false
+      });
+    });
+  }, [renderedHtml, loading]);
+
   useEffect(() => {
     if (article?.author_id) {
       fetchArticleAuthor();
@@ -67,6 +81,20 @@ const ArticleView: React.FC = () => {
     }
   };
 
+  // İçerik sunucuda render edilir ve temizlenir (versiyon bazında önbelleklenir)
+  const fetchRendered = async (versionNumber?: number) => {
+    try {
+      const token = localStorage.getItem('token');
+      const query = versionNumber ? `?version_number=${versionNumber}` : '';
+      const response = await axios.get(`http://localhost:8080/articles/${id}/rendered${query}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setRenderedHtml(response.data.html);
+    } catch (error) {
+      console.error('Makale içeriği yüklenemedi');
+    }
+  };
+
   const fetchCollaborators = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -111,6 +139,7 @@ const ArticleView: React.FC = () => {
       });
       
       setArticle({ ...article!, content: response.data.content });
+      await fetchRendered(versionNumber);
       setSelectedVersion(versionNumber);
       toast.success(`Versiyon ${versionNumber} yüklendi`);
     } catch (error) {
@@ -129,124 +158,6 @@ const ArticleView: React.FC = () => {
     });
   };
 
-  // Kullanıcı etiketlerini renkli gösterme fonksiyonu
-  const renderColoredContent = (content: string) => {
-    if (!content) return '';
-    
-    // Önce kullanıcı etiketlerini işle
-    return processUserTags(content);
-  };
-
-  // Kullanıcı etiketlerini işle (string için)
-  const processUserTags = (content: string) => {
-    if (!content) return '';
-
-    const lines = content.split('\n');
-    let currentUserColor = '#000000'; // Varsayılan siyah
-    let currentUsername = '';
-
-    const coloredLines = lines.map((line, index) => {
-      // Kullanıcı etiketi kontrolü
-      const userMatch = line.match(/^\[([^-]+) - ([^\]]+)\]/);
-      if (userMatch) {
-        const username = userMatch[1].trim();
-        const timestamp = userMatch[2].trim();
-
-        // Kullanıcıyı bul
-        const user = collaborators.find(c => c.username === username) || 
-                    (articleAuthor && articleAuthor.username === username ? articleAuthor : null);
-
-        if (user) {
-          currentUserColor = getColorClass(user.id);
-          currentUsername = username;
-        }
-
-        const contentAfterTag = line.substring(line.indexOf(']') + 1);
-
-        return (
-          <div key={index} style={{
-            padding: '4px 0',
-            margin: '2px 0'
-          }}>
-            <span style={{ color: currentUserColor, fontWeight: 'bold' }}>
-              [{username} - {timestamp}]
-            </span>
-            {contentAfterTag && contentAfterTag.trim() && (
-              <span style={{ color: currentUserColor, marginLeft: '8px' }}>
-                {contentAfterTag}
-              </span>
-            )}
-          </div>
-        );
-      }
-
-      // Kullanıcı etiketi yoksa, önceki kullanıcının rengini kullan
-      if (line.trim() && currentUsername) {
-        return (
-          <div key={index} style={{
-            padding: '2px 0',
-            margin: '1px 0'
-          }}>
-            <span style={{ color: currentUserColor }}>
-              {line}
-            </span>
-          </div>
-        );
-      }
-
-      // Hiçbir kullanıcı etiketi yoksa normal göster
-      return <div key={index}>{line}</div>;
-    });
-
-    return <div className="whitespace-pre-wrap">{coloredLines}</div>;
-  };
-
-  // Kullanıcı etiketlerini işle (JSX için)
-  const processUserTagsJSX = (content: JSX.Element | JSX.Element[]) => {
-    // Basit implementasyon - daha gelişmiş olabilir
-    return content;
-  };
-
-  // Markdown render fonksiyonu
-  const renderMarkdown = (text: string): string => {
-    return text
-      // Başlıklar
-      .replace(/^### (.*$)/gim, '<h3>$1</h3>')
-      .replace(/^## (.*$)/gim, '<h2>$1</h2>')
-      .replace(/^# (.*$)/gim, '<h1>$1</h1>')
-      // Kalın
-      .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
-      // İtalik
-      .replace(/\*(.*?)\*/g, '<em>$1</em>')
-      // Altı çizili
-      .replace(/__(.*?)__/g, '<u>$1</u>')
-      // Üstü çizili
-      .replace(/~~(.*?)~~/g, '<del>$1</del>')
-      // Alıntı
-      .replace(/^> (.*$)/gim, '<blockquote>$1</blockquote>')
-      // Kod
-      .replace(/`(.*?)`/g, '<code>$1</code>')
-      // LaTeX (satır içi) - KaTeX ile render edilecek
-      .replace(/\$([^$\n]+?)\$/g, (match, latex) => {
-        try {
-          return `<span class="latex-inline" data-latex="${latex}">$${latex}$</span>`;
-        } catch (error) {
-          return match;
-        }
-      })
-      // Linkler
-      .replace(/\[([^\]]+)\]\(([^)]+)\)/g, '<a href="$2" target="_blank" class="text-blue-600 hover:underline">$1</a>')
-      // Satır sonları
-      .replace(/\n/g, '<br>');
-  };
-
-  // Renk sınıfı belirleme
-  const getColorClass = (userId: number): string => {
-    // Daha belirgin renkler - sarı, kırmızı, mavi, yeşil, mor, turuncu
-    const colors = ['#FFD700', '#FF4444', '#3B82F6', '#10B981', '#8B5CF6', '#F97316'];
-    return colors[userId % colors.length];
-  };
-
   if (loading) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-slate-50 via-blue-50 to-indigo-100 flex justify-center items-center">
@@ -368,8 +279,9 @@ const ArticleView: React.FC = () => {
             <div className="bg-white/80 backdrop-blur-sm rounded-2xl p-8 border border-white/20 shadow-lg">
               <div className="prose prose-lg max-w-none">
                 <div 
+                  ref={contentRef}
                   className="text-gray-800 leading-relaxed"
-                  dangerouslySetInnerHTML={{ __html: article.content }}
+                  dangerouslySetInnerHTML={{ __html: renderedHtml }}
                 />
               </div>
             </div>
@@ -5,10 +5,12 @@ import { toast } from 'react-hot-toast';
 import { Plus, Eye, Edit, Calendar, BookOpen, Filter, Sparkles } from 'lucide-react';
 import Navbar from './Navbar';
 
-interface Article {
+interface ArticleSummary {
   id: number;
   title: string;
-  content: string;
+  excerpt: string;
+  word_count: number;
+  reading_time_minutes: number;
   author_id: number;
   is_public: boolean;
   created_at: string;
@@ -16,7 +18,7 @@ interface Article {
 }
 
 const Dashboard: React.FC = () => {
-  const [articles, setArticles] = useState<Article[]>([]);
+  const [articles, setArticles] = useState<ArticleSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [showPublicOnly, setShowPublicOnly] = useState(false);
   const [currentUser, setCurrentUser] = useState<any>(null);
@@ -42,7 +44,7 @@ const Dashboard: React.FC = () => {
   const fetchArticles = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`http://localhost:8080/articles?public_only=${showPublicOnly}`, {
+      const response = await axios.get(`http://localhost:8080/articles?public_only=${showPublicOnly}&fields=summary`, {
         headers: { Authorization: `Bearer ${token}` }
       });
       setArticles(response.data);
@@ -197,7 +199,7 @@ const Dashboard: React.FC = () => {
                   </div>
                   
                   <p className="text-gray-600 text-sm mb-6 line-clamp-3 leading-relaxed">
-                    {article.content.replace(/<[^>]*>/g, '').substring(0, 150)}...
+                    {article.excerpt}...
                   </p>
 
                   <div className="flex items-center text-sm text-gray-500 mb-6">